@@ -19,36 +19,75 @@
 │     └─ Each cell: [key_size, data_size, key, data]          │
 └─────────────────────────────────────────────────────────────┘
 """
-from enum import Enum, auto
-import sys
-import os
-from pager import DatabaseFileHeader, Pager
-from typing import Any, List
+from array import array
+from enum import IntEnum
+import bisect
+import io
+import logging
+import struct
+from pager import Pager, PAGE_SIZE
 
-from record import Record, deserialize, deserialize_key, serialize, cell_size
-from schema.basic_schema import BasicSchema, Column
-from schema.datatypes import Integer, Text
+from record import deserialize_key, deserialize_key_at, cell_size
+
+logger = logging.getLogger(__name__)
 
 Cell = bytearray
 
-# Constants
-INTERNAL_NODE_MAX_KEYS = 3
-LEAF_NODE_MAX_CELLS = 3
-LEAF_NODE_RIGHT_SPLIT_COUNT = (LEAF_NODE_MAX_CELLS + 1) // 2
-LEAF_NODE_LEFT_SPLIT_COUNT = (LEAF_NODE_MAX_CELLS + 1) - LEAF_NODE_RIGHT_SPLIT_COUNT
+# Fixed 16-byte prefix shared by both node headers:
+# flags (1B) + 3 reserved bytes, parent_page_num, num_keys/num_cells, right_child_page_num/allocation_pointer
+_HEADER_PREFIX = struct.Struct("=B3x3i")
+HEADER_PREFIX_SIZE = _HEADER_PREFIX.size
+# num_cells and allocation_pointer, which sit next to each other in a leaf header
+_LEAF_COUNTS = struct.Struct("=2i")
+_LEAF_COUNTS_OFFSET = 8
+# Cell offsets are below PAGE_SIZE, so two bytes per cell pointer are enough
+_CELL_POINTER = struct.Struct("=H")
+CELL_POINTER_SIZE = _CELL_POINTER.size
+# parent_page_num, at the same place in both node headers
+_PARENT_PAGE_NUM = struct.Struct("=i")
+_PARENT_PAGE_NUM_OFFSET = 4
+# Shared source of zero bytes for clearing part of a page without allocating a pad each time
+_ZEROS = memoryview(bytes(PAGE_SIZE))
+# Bits of the flags byte
+IS_ROOT_FLAG = 0x1
+LEAF_FLAG = 0x2
 
-class NodeType(Enum):
+# Constants
+# Nodes are as wide as a page allows: an internal node stores a key and a child pointer per entry,
+# a leaf at least a cell pointer plus the smallest cell (key_size, data_size, an Integer key, and the
+# column size and value of a table whose only column is that key)
+MIN_CELL_SIZE = 20
+INTERNAL_NODE_MAX_KEYS = (PAGE_SIZE - HEADER_PREFIX_SIZE) // 8
+LEAF_NODE_MAX_CELLS = (PAGE_SIZE - HEADER_PREFIX_SIZE) // (CELL_POINTER_SIZE + MIN_CELL_SIZE)
+# A leaf holding fewer bytes than this after a delete is merged with or rebalanced against a sibling
+LEAF_NODE_MIN_FILL = (PAGE_SIZE - HEADER_PREFIX_SIZE) // 4
+
+class NodeType(IntEnum):
     INTERNAL = 0
     LEAF = 1
 
 
-def get_node_type(header: bytes) -> NodeType:
-    return NodeType(Integer.deserialize(header[0:4]))
+def get_node_type(header: bytes | bytearray | memoryview) -> NodeType:
+    return NodeType.LEAF if header[0] & LEAF_FLAG else NodeType.INTERNAL
+
+
+def is_leaf(header: bytes | bytearray | memoryview) -> bool:
+    """Check the leaf bit of the flags byte without building a NodeType."""
+    return bool(header[0] & LEAF_FLAG)
+
+
+def parse_header(header: bytes | bytearray | memoryview):
+    """Parse a page header as a leaf or internal node header based on its node type."""
+    if is_leaf(header):
+        return LeafNodeHeader.from_header(header)
+    return InternalNodeHeader.from_header(header)
 
 class InternalNodeHeader:
     """
     The header of an internal node in the B-tree.
     """
+    __slots__ = ("node_type", "is_root", "parent_page_num", "num_keys", "right_child_page_num", "keys", "children")
+
     def __init__(self,
                  is_root: bool,
                  parent_page_num: int,
@@ -61,54 +100,77 @@ class InternalNodeHeader:
         self.parent_page_num = parent_page_num
         self.num_keys = num_keys
         self.right_child_page_num = right_child_page_num
-        self.keys = keys
-        self.children = children
+        self.keys = array("i", keys)
+        self.children = array("i", children)
 
     @staticmethod
-    def from_header(header: bytes):
-        is_root = Integer.deserialize(header[4:8]) == 1
-        parent_page_num = Integer.deserialize(header[8:12])
-        num_keys = Integer.deserialize(header[12:16])
-        right_child_page_num = Integer.deserialize(header[16:20])
-        keys = []
-        for i in range(num_keys):
-            keys.append(Integer.deserialize(header[20 + i * 4:24 + i * 4]))
-        children = []
-        children_offset = 20 + num_keys * 4
-        for i in range(num_keys):  # Read exactly num_keys children (the +1 child is in right_child_page_num)
-            children.append(Integer.deserialize(header[children_offset + i * 4:children_offset + (i + 1) * 4]))
-        result = InternalNodeHeader(is_root, parent_page_num, num_keys, right_child_page_num, keys, children)
+    def from_header(header: bytes | bytearray | memoryview):
+        flags, parent_page_num, num_keys, right_child_page_num = _HEADER_PREFIX.unpack_from(header, 0)
+        view = memoryview(header)
+        keys_offset = HEADER_PREFIX_SIZE
+        children_offset = keys_offset + num_keys * 4
+        keys = array("i")
+        keys.frombytes(view[keys_offset:children_offset])
+        # Read exactly num_keys children (the +1 child is in right_child_page_num)
+        children = array("i")
+        children.frombytes(view[children_offset:children_offset + num_keys * 4])
+        result = InternalNodeHeader(bool(flags & IS_ROOT_FLAG), parent_page_num, num_keys, right_child_page_num, keys, children)
         return result
 
     def to_header(self):
-        header_bytes = Integer.serialize(self.node_type.value) + Integer.serialize(1 if self.is_root else 0) + Integer.serialize(self.parent_page_num) + Integer.serialize(self.num_keys) + Integer.serialize(self.right_child_page_num) + b"".join(Integer.serialize(key) for key in self.keys) + b"".join(Integer.serialize(child) for child in self.children)
-        return header_bytes
+        header = bytearray(HEADER_PREFIX_SIZE + (len(self.keys) + len(self.children)) * 4)
+        self.write_into(header)
+        return header
+
+    def write_into(self, page: bytearray | memoryview):
+        """Serialize the header straight into the start of a page, without building an intermediate bytes object."""
+        flags = IS_ROOT_FLAG if self.is_root else 0
+        _HEADER_PREFIX.pack_into(page, 0, flags, self.parent_page_num, self.num_keys, self.right_child_page_num)
+        children_offset = HEADER_PREFIX_SIZE + len(self.keys) * 4
+        page[HEADER_PREFIX_SIZE:children_offset] = memoryview(self.keys).cast("B")
+        page[children_offset:children_offset + len(self.children) * 4] = memoryview(self.children).cast("B")
 
 class LeafNodeHeader:
     """
     The header of a page in the B-tree.
     """
+    __slots__ = ("node_type", "is_root", "parent_page_num", "num_cells", "allocation_pointer", "cell_pointers")
+
     def __init__(self, is_root: bool, parent_page_num: int, num_cells: int, allocation_pointer: int, cell_pointers: list[int]):
         self.node_type = NodeType.LEAF
         self.is_root = is_root
         self.num_cells = num_cells
         self.allocation_pointer = allocation_pointer
         self.parent_page_num = parent_page_num
-        self.cell_pointers = cell_pointers
+        self.cell_pointers = array("H", cell_pointers)
 
     @staticmethod
-    def from_header(header: bytes):
-        is_root = Integer.deserialize(header[4:8]) == 1
-        parent_page_num = Integer.deserialize(header[8:12])
-        num_cells = Integer.deserialize(header[12:16])
-        allocation_pointer = Integer.deserialize(header[16:20])
-        cell_pointers = []
-        for i in range(num_cells):
-            cell_pointers.append(Integer.deserialize(header[20 + i * 4:24 + i * 4]))
-        return LeafNodeHeader(is_root, parent_page_num, num_cells, allocation_pointer, cell_pointers)
+    def from_header(header: bytes | bytearray | memoryview):
+        flags, parent_page_num, num_cells, allocation_pointer = _HEADER_PREFIX.unpack_from(header, 0)
+        cell_pointers = array("H")
+        cell_pointers.frombytes(memoryview(header)[HEADER_PREFIX_SIZE:LeafNodeHeader.header_size(num_cells)])
+        return LeafNodeHeader(bool(flags & IS_ROOT_FLAG), parent_page_num, num_cells, allocation_pointer, cell_pointers)
 
     def to_header(self):
-        return Integer.serialize(self.node_type.value) + Integer.serialize(1 if self.is_root else 0) + Integer.serialize(self.parent_page_num) + Integer.serialize(self.num_cells) + Integer.serialize(self.allocation_pointer) + b"".join(Integer.serialize(cell_pointer) for cell_pointer in self.cell_pointers)
+        header = bytearray(LeafNodeHeader.header_size(len(self.cell_pointers)))
+        self.write_into(header)
+        return header
+
+    def write_into(self, page: bytearray | memoryview):
+        """Serialize the header straight into the start of a page, without building an intermediate bytes object."""
+        flags = LEAF_FLAG | (IS_ROOT_FLAG if self.is_root else 0)
+        _HEADER_PREFIX.pack_into(page, 0, flags, self.parent_page_num, self.num_cells, self.allocation_pointer)
+        page[HEADER_PREFIX_SIZE:LeafNodeHeader.header_size(len(self.cell_pointers))] = memoryview(self.cell_pointers).cast("B")
+
+    def max_key(self, page: bytearray | memoryview) -> int | None:
+        """Return the largest key in the leaf, or None if it is empty. Cells are sorted, so this is the last cell's key."""
+        if self.num_cells == 0:
+            return None
+        return deserialize_key_at(page, self.cell_pointers[self.num_cells - 1])
+
+    @staticmethod
+    def header_size(num_cells: int) -> int:
+        return HEADER_PREFIX_SIZE + CELL_POINTER_SIZE * num_cells
 
     def __str__(self):
         return f"LeafNodeHeader(node_type={self.node_type}, is_root={self.is_root}, parent_page_num={self.parent_page_num}, num_cells={self.num_cells}, allocation_pointer={self.allocation_pointer}, cell_pointers={self.cell_pointers})"
@@ -138,95 +200,108 @@ class BTree:
         self.root_page_num = root_page_num
         # Initialize root page as leaf if empty
         page = self.pager.get_page(root_page_num)
-        if all(b == 0 for b in page):
+        if not any(page):
             header = LeafNodeHeader(is_root=True, parent_page_num=0, num_cells=0, allocation_pointer=self.pager.page_size, cell_pointers=[])
-            header_bytes = header.to_header()
-            page[:len(header_bytes)] = header_bytes
-            self.pager.write_page(root_page_num, bytes(page))
+            header.write_into(page)
+            self.pager.write_page(root_page_num, page)
             # Ensure num_pages is correct so get_free_page never returns root
             if root_page_num >= self.pager.num_pages:
                 self.pager.num_pages = root_page_num + 1
 
     def __str__(self):
         """Returns a string representation of the B-tree structure"""
-        def print_node(page_num: int, level: int = 0) -> str:
-            page = self.pager.get_page(page_num)
-            node_type = NodeType(Integer.deserialize(page[0:4]))
-            result = "  " * level
+        buf = io.StringIO()
+        buf.write(f"B-tree (root: page {self.root_page_num}):\n")
+        # Walk the tree depth-first with an explicit stack of (level, page_num, key) entries;
+        # an entry without a page_num is a separator key line of its parent
+        stack = [(0, self.root_page_num, None)]
+        while stack:
+            level, page_num, key = stack.pop()
+            indent = "  " * level
+            if page_num is None:
+                buf.write(f"{indent}Key: {key}\n")
+                continue
 
-            if node_type == NodeType.LEAF:
-                header = LeafNodeHeader.from_header(page)
-                result += f"Leaf Node (page {page_num}): {header.num_cells} cells\n"
+            page = self.pager.get_page(page_num)
+            header = self.get_header(page_num)
+            if is_leaf(page):
+                buf.write(f"{indent}Leaf Node (page {page_num}): {header.num_cells} cells\n")
+                key_indent = indent + "  "
                 for ptr in header.cell_pointers:
-                    cell_data = page[ptr:]
-                    key = deserialize_key(cell_data)
-                    result += "  " * (level + 1) + f"Key: {key}\n"
+                    buf.write(f"{key_indent}Key: {deserialize_key_at(page, ptr)}\n")
             else:  # INTERNAL
-                header = InternalNodeHeader.from_header(page)
-                result += f"Internal Node (page {page_num}): {header.num_keys} keys\n"
-                # Print children recursively
+                buf.write(f"{indent}Internal Node (page {page_num}): {header.num_keys} keys\n")
+                entries = []
                 for i, child in enumerate(header.children):
                     if i > 0:
-                        result += "  " * (level + 1) + f"Key: {header.keys[i-1]}\n"
-                    result += print_node(child, level + 1)
+                        entries.append((level + 1, None, header.keys[i - 1]))
+                    entries.append((level + 1, child, None))
                 # Print the right child if it exists
                 if header.right_child_page_num != 0:
                     if len(header.children) > 0:
-                        result += "  " * (level + 1) + f"Key: {header.keys[-1]}\n"
-                    result += print_node(header.right_child_page_num, level + 1)
+                        entries.append((level + 1, None, header.keys[-1]))
+                    entries.append((level + 1, header.right_child_page_num, None))
+                # Pushed in reverse so they come off the stack left to right
+                stack.extend(reversed(entries))
 
-            return result
-
-        return f"B-tree (root: page {self.root_page_num}):\n" + print_node(self.root_page_num)
+        return buf.getvalue()
 
     # public APIs
     def find(self, key: int, page_num: int = None) -> int:
-        # recursively find the page that contains the key
+        """
+        Find the leaf page that should contain the key.
+        Each internal node key is the max key of the child on its left, so the
+        child to descend into is the first one whose key is >= the search key.
+        """
         if page_num is None:
             page_num = self.root_page_num
-        page = self.pager.get_page(page_num)
-        node_type_val = Integer.deserialize(page[0:4])
-        node_type = NodeType(node_type_val)
-        # If the page is uninitialized (all zeros or invalid header), initialize it as a leaf node
-        header = None
-        # Only check allocation_pointer for LEAF nodes
-        if (node_type not in (NodeType.LEAF, NodeType.INTERNAL)) or \
-           (node_type == NodeType.LEAF and int.from_bytes(page[16:20], sys.byteorder) < 128):
-            header = LeafNodeHeader(is_root=False, parent_page_num=0, num_cells=0, allocation_pointer=self.pager.page_size, cell_pointers=[])
-            header_bytes = header.to_header()
-            page[:len(header_bytes)] = header_bytes
-            self.pager.write_page(page_num, bytes(page))
-            self.pager.pages[page_num] = page
-            node_type = NodeType.LEAF
-        if node_type == NodeType.LEAF:
-            header = LeafNodeHeader.from_header(page)
-            return page_num
-        elif node_type == NodeType.INTERNAL:
-            header = InternalNodeHeader.from_header(page)
+        while True:
+            page = self.pager.get_page(page_num)
+            flags = page[0]
+            if flags & ~(IS_ROOT_FLAG | LEAF_FLAG):
+                return self._reset_invalid_leaf(page_num, page)
+            if flags & LEAF_FLAG:
+                # Cells can never overlap the header of a valid leaf
+                num_cells, allocation_pointer = _LEAF_COUNTS.unpack_from(page, _LEAF_COUNTS_OFFSET)
+                if allocation_pointer < LeafNodeHeader.header_size(num_cells):
+                    return self._reset_invalid_leaf(page_num, page)
+                return page_num
+            header = self.get_header(page_num)
             # An internal node with n keys has n children in children[] and 1 child in right_child_page_num
-            if len(header.children) == 0:
-                # Only one child (in right_child_page_num)
-                return self.find(key, header.right_child_page_num)
+            idx = bisect.bisect_left(header.keys, key)
+            if idx < len(header.children):
+                page_num = header.children[idx]
             else:
-                # Multiple children - find the correct one based on keys
-                left_child_page_num = header.children[0]
-                # Get the largest key in the left child
-                left_child_page = self.pager.get_page(left_child_page_num)
-                left_child_header = LeafNodeHeader.from_header(left_child_page)
-                if left_child_header.num_cells == 0:
-                    # If left child is empty, go right
-                    return self.find(key, header.right_child_page_num)
-                # Get the largest key in the left child
-                max_key = None
-                for ptr in left_child_header.cell_pointers:
-                    cell_data = left_child_page[ptr:]
-                    cell_key = deserialize_key(cell_data)
-                    if max_key is None or cell_key > max_key:
-                        max_key = cell_key
-                if key <= max_key:
-                    return self.find(key, left_child_page_num)
-                else:
-                    return self.find(key, header.right_child_page_num)
+                page_num = header.right_child_page_num
+
+    def _reset_invalid_leaf(self, page_num: int, page: bytearray) -> int:
+        """The page is uninitialized (all zeros or invalid header), initialize it as an empty leaf node"""
+        header = LeafNodeHeader(is_root=False, parent_page_num=0, num_cells=0, allocation_pointer=self.pager.page_size, cell_pointers=[])
+        header.write_into(page)
+        self.pager.write_page(page_num, page)
+        return page_num
+
+    def find_cell(self, page: bytearray | memoryview, key: int) -> int:
+        """
+        Find the index of the first cell in a leaf page whose key is >= key
+        (num_cells if there is none). Cells are kept sorted by key, so this is
+        a binary search; the loop only narrows a (bottom, size) window so every
+        iteration does the same work whichever way the comparison goes.
+        """
+        num_cells = _HEADER_PREFIX.unpack_from(page)[2]
+        bottom = 0
+        size = num_cells
+        while size > 1:
+            half = size >> 1
+            ptr = _CELL_POINTER.unpack_from(page, LeafNodeHeader.header_size(bottom + half - 1))[0]
+            if deserialize_key_at(page, ptr) < key:
+                bottom += half
+            size -= half
+        if size == 1:
+            ptr = _CELL_POINTER.unpack_from(page, LeafNodeHeader.header_size(bottom))[0]
+            if deserialize_key_at(page, ptr) < key:
+                bottom += 1
+        return bottom
 
     @staticmethod
     def new_tree(pager: Pager):
@@ -234,9 +309,8 @@ class BTree:
         root_page_num = pager.get_free_page()
         root_page = bytearray(pager.page_size)
         root_header = LeafNodeHeader(is_root=True, parent_page_num=0, num_cells=0, allocation_pointer=pager.page_size, cell_pointers=[])
-        header_bytes = root_header.to_header()
-        root_page[:len(header_bytes)] = header_bytes
-        pager.write_page(root_page_num, bytes(root_page))
+        root_header.write_into(root_page)
+        pager.write_page(root_page_num, root_page)
         return BTree(pager, root_page_num)
 
 
@@ -246,41 +320,73 @@ class BTree:
         The cell is added to the page, updating the page header accordingly.
         Returns a tuple of (position, length) where the cell was stored.
         """
+        return self._insert(cell, deserialize_key(cell))
+
+    def _insert(self, cell: Cell, cell_key: int):
+        """insert() for a cell whose key has already been decoded; the key is reused all the way down to the leaf"""
         # Find the correct page to insert into
-        cell_key = deserialize_key(cell)
         page_num = self.find(cell_key)
 
-        # Get the current page
-        page = bytearray(self.pager.get_page(page_num))
-
-        # Parse the page header
-        header = LeafNodeHeader.from_header(page)
+        page = self.pager.get_page(page_num)
+        while not self._leaf_has_room(page, len(cell)):
+            header = self.get_header(page_num)
+            if header.num_cells == 0:
+                # The cell is larger than a page; let insert_cell_into_leaf_node report it
+                break
+            if header.num_cells < LEAF_NODE_MAX_CELLS and \
+               self._leaf_used_bytes(page, header) + CELL_POINTER_SIZE + len(cell) <= self.pager.page_size - HEADER_PREFIX_SIZE:
+                # Deleted cells left enough space behind; reclaim it instead of splitting
+                self._write_leaf(page_num, header, self._leaf_cells(page, header))
+            else:
+                # Split the leaf node; the split knows which half the key now belongs to.
+                # With very uneven cell sizes that half can still be too full, so check again
+                page_num = self.split_leaf_node(page_num, cell_key, len(cell))
+            page = self.pager.get_page(page_num)
+        return self.insert_cell_into_leaf_node(cell, page_num, cell_key)
 
-        num_cells = header.num_cells
-        if num_cells < LEAF_NODE_MAX_CELLS:
-            # Insert into the leaf node
-            result = self.insert_cell_into_leaf_node(cell, page_num)
-            header_after = LeafNodeHeader.from_header(self.pager.get_page(page_num))
-            return result
-        else:
-            # Split the leaf node
-            self.split_leaf_node(page_num)
-            # Re-fetch the page after split
+    def insert_many(self, cells: list[Cell]):
+        """
+        Insert many cells into the B-tree.
+        Consecutive cells that land in the same leaf are written into the page
+        in memory and the page is flushed once, instead of once per cell.
+        Returns a list of (position, length) tuples, one per cell.
+        """
+        results = []
+        batch_page_num = None
+        for cell in cells:
+            cell_key = deserialize_key(cell)
             page_num = self.find(cell_key)
-            result = self.insert_cell_into_leaf_node(cell, page_num)
-            header_after = LeafNodeHeader.from_header(self.pager.get_page(page_num))
-            return result
+            full = not self._leaf_has_room(self.pager.get_page(page_num), len(cell))
+            if batch_page_num is not None and (page_num != batch_page_num or full):
+                self.pager.flush_page(batch_page_num)
+                batch_page_num = None
+
+            if full:
+                # The leaf has to be compacted or split, which goes through the regular insert path
+                results.append(self._insert(cell, cell_key))
+                continue
+
+            batch_page_num = page_num
+            results.append(self._place_cell_in_leaf(cell, page_num, cell_key))
+
+        if batch_page_num is not None:
+            self.pager.flush_page(batch_page_num)
+        return results
 
     def update_cell(self, key: int, new_cell: Cell):
         """
         Update a cell in the B-tree by replacing it with new cell data.
         """
         leaf_page_num = self.find(key)
-        leaf_page = bytearray(self.pager.get_page(leaf_page_num))
+        leaf_page = self.pager.get_page(leaf_page_num)
         leaf_header = LeafNodeHeader.from_header(leaf_page)
+        # Slicing a memoryview does not copy the rest of the page for every cell
+        leaf_view = memoryview(leaf_page)
         
-        for i, ptr in enumerate(leaf_header.cell_pointers):
-            cell_data = leaf_page[ptr:]
+        i = self.find_cell(leaf_page, key)
+        if i < leaf_header.num_cells:
+            ptr = leaf_header.cell_pointers[i]
+            cell_data = leaf_view[ptr:]
             cell_key = deserialize_key(cell_data)
             if cell_key == key:
                 # Get the current cell size
@@ -293,19 +399,21 @@ class BTree:
                     leaf_page[ptr:ptr + new_cell_size] = new_cell
                     # Clear any remaining space if new cell is smaller
                     if new_cell_size < current_cell_size:
-                        leaf_page[ptr + new_cell_size:ptr + current_cell_size] = b'\x00' * (current_cell_size - new_cell_size)
+                        leaf_page[ptr + new_cell_size:ptr + current_cell_size] = _ZEROS[:current_cell_size - new_cell_size]
                 else:
-                    # New cell is larger - handle by removing old cell and inserting new one
-                    # Remove the old cell
+                    # New cell is larger - handle by removing old cell and inserting new one.
+                    # Check for room before anything is removed; a leaf without room goes
+                    # through the regular insert path, which compacts or splits it
+                    has_room = self._leaf_has_room(leaf_page, new_cell_size)
                     self._remove_cell_from_leaf(leaf_page_num, i)
-                    
-                    # Insert the new cell
-                    self.insert_cell_into_leaf_node(new_cell, leaf_page_num)
+                    if has_room:
+                        self.insert_cell_into_leaf_node(new_cell, leaf_page_num, key)
+                    else:
+                        self._insert(new_cell, key)
                     return True
                 
                 # Write the updated page
-                self.pager.write_page(leaf_page_num, bytes(leaf_page))
-                self.pager.pages[leaf_page_num] = leaf_page
+                self.pager.write_page(leaf_page_num, leaf_page)
                 return True
         
         raise ValueError(f"Key {key} not found in B-tree")
@@ -323,19 +431,14 @@ class BTree:
         """
         # Step 1: Find the leaf page containing the key
         leaf_page_num = self.find(key)
-        leaf_page = bytearray(self.pager.get_page(leaf_page_num))
-        leaf_header = LeafNodeHeader.from_header(leaf_page)
+        leaf_page = self.pager.get_page(leaf_page_num)
+        leaf_header = self.get_header(leaf_page_num)
         
         # Step 2: Find the cell with the target key
-        cell_index = None
-        target_cell_ptr = None
-        for i, ptr in enumerate(leaf_header.cell_pointers):
-            cell_data = leaf_page[ptr:]
-            cell_key = deserialize_key(cell_data)
-            if cell_key == key:
-                cell_index = i
-                target_cell_ptr = ptr
-                break
+        cell_index = self.find_cell(leaf_page, key)
+        if cell_index == leaf_header.num_cells or \
+           deserialize_key_at(leaf_page, leaf_header.cell_pointers[cell_index]) != key:
+            cell_index = None
         
         # If key doesn't exist, terminate
         if cell_index is None:
@@ -350,13 +453,11 @@ class BTree:
             self._update_parent_keys_after_deletion(leaf_page_num, key)
         
         # Step 5: Check if restructuring is needed
-        leaf_page = bytearray(self.pager.get_page(leaf_page_num))
-        leaf_header = LeafNodeHeader.from_header(leaf_page)
-        
-        # Define minimum threshold for restructuring
-        min_keys_threshold = LEAF_NODE_MAX_CELLS // 2
+        leaf_page = self.pager.get_page(leaf_page_num)
+        leaf_header = self.get_header(leaf_page_num)
         
-        if leaf_header.num_cells < min_keys_threshold and not leaf_header.is_root:
+        # Restructure once the leaf is less than a quarter full
+        if self._leaf_used_bytes(leaf_page, leaf_header) < LEAF_NODE_MIN_FILL and not leaf_header.is_root:
             self._handle_underflow(leaf_page_num)
         
         # Step 6: Handle root deletion if needed
@@ -368,17 +469,11 @@ class BTree:
 
     def _is_max_key_in_node(self, page: bytearray, header: LeafNodeHeader, key: int) -> bool:
         """Check if the given key is the maximum key in the node"""
-        max_key = None
-        for ptr in header.cell_pointers:
-            cell_data = page[ptr:]
-            cell_key = deserialize_key(cell_data)
-            if max_key is None or cell_key > max_key:
-                max_key = cell_key
-        return max_key == key
+        return header.max_key(page) == key
 
     def _remove_cell_from_leaf(self, page_num: int, cell_index: int):
         """Remove a cell from a leaf node by index"""
-        page = bytearray(self.pager.get_page(page_num))
+        page = self.pager.get_page(page_num)
         header = LeafNodeHeader.from_header(page)
         
         # Remove the cell pointer at the specified index
@@ -387,86 +482,76 @@ class BTree:
             header.num_cells -= 1
             
             # Update the header in the page
-            header_bytes = header.to_header()
-            page[:len(header_bytes)] = header_bytes
-            self.pager.write_page(page_num, bytes(page))
-            self.pager.pages[page_num] = page
+            header.write_into(page)
+            self.pager.write_page(page_num, page)
 
     def _update_parent_keys_after_deletion(self, leaf_page_num: int, deleted_key: int):
         """Update parent keys when the max key in a child node is deleted"""
         leaf_page = self.pager.get_page(leaf_page_num)
-        leaf_header = LeafNodeHeader.from_header(leaf_page)
+        leaf_header = self.get_header(leaf_page_num)
         
         if leaf_header.parent_page_num == 0:
             return  # No parent to update
         
         # Find the new max key in the leaf node
-        new_max_key = None
-        if leaf_header.num_cells > 0:
-            for ptr in leaf_header.cell_pointers:
-                cell_data = leaf_page[ptr:]
-                cell_key = deserialize_key(cell_data)
-                if new_max_key is None or cell_key > new_max_key:
-                    new_max_key = cell_key
-        
+        new_max_key = leaf_header.max_key(leaf_page)
+        if new_max_key is None:
+            return  # Leaf is now empty; the old key is still a valid upper bound until it is merged
+
         # Update parent internal node
         self._update_internal_node_key(leaf_header.parent_page_num, leaf_page_num, deleted_key, new_max_key)
 
     def _update_internal_node_key(self, internal_page_num: int, child_page_num: int, old_key: int, new_key: int):
         """Update a key in an internal node"""
-        internal_page = bytearray(self.pager.get_page(internal_page_num))
+        internal_page = self.pager.get_page(internal_page_num)
         internal_header = InternalNodeHeader.from_header(internal_page)
         
-        # Find and update the key
+        # Find and update the key; keys are sorted, so it can be bisected
         key_updated = False
-        for i, key in enumerate(internal_header.keys):
-            if key == old_key:
-                if new_key is not None:
-                    internal_header.keys[i] = new_key
-                else:
-                    # If new_key is None, we need to remove this key
-                    internal_header.keys.pop(i)
-                    internal_header.num_keys -= 1
-                key_updated = True
-                break
+        i = bisect.bisect_left(internal_header.keys, old_key)
+        if i < len(internal_header.keys) and internal_header.keys[i] == old_key:
+            if new_key is not None:
+                internal_header.keys[i] = new_key
+            else:
+                # If new_key is None, we need to remove this key
+                internal_header.keys.pop(i)
+                internal_header.num_keys -= 1
+            key_updated = True
         
         if key_updated:
             # Write the updated header back
-            header_bytes = internal_header.to_header()
-            internal_page[:len(header_bytes)] = header_bytes
-            self.pager.write_page(internal_page_num, bytes(internal_page))
-            self.pager.pages[internal_page_num] = internal_page
+            internal_header.write_into(internal_page)
+            self.pager.write_page(internal_page_num, internal_page)
             
             # If this was the max key in the internal node and we changed it,
             # we may need to update the parent as well
-            if old_key == max(internal_header.keys + [old_key]) and internal_header.parent_page_num != 0:
+            if (not internal_header.keys or old_key >= internal_header.keys[-1]) and internal_header.parent_page_num != 0:
                 self._update_internal_node_key(internal_header.parent_page_num, internal_page_num, old_key, new_key)
 
     def _handle_underflow(self, page_num: int):
         """Handle underflow in a node by merging or redistributing with siblings"""
         page = self.pager.get_page(page_num)
-        node_type = get_node_type(page)
         
-        if node_type == NodeType.LEAF:
+        if is_leaf(page):
             self._handle_leaf_underflow(page_num)
         else:
             self._handle_internal_underflow(page_num)
 
     def _handle_leaf_underflow(self, leaf_page_num: int):
         """Handle underflow in a leaf node"""
-        leaf_page = self.pager.get_page(leaf_page_num)
-        leaf_header = LeafNodeHeader.from_header(leaf_page)
+        leaf_header = self.get_header(leaf_page_num)
         
         if leaf_header.parent_page_num == 0:
             return  # Root node, no siblings to merge with
         
         # Get parent and find siblings
-        parent_page = self.pager.get_page(leaf_header.parent_page_num)
-        parent_header = InternalNodeHeader.from_header(parent_page)
+        parent_header = self.get_header(leaf_header.parent_page_num)
+        if not isinstance(parent_header, InternalNodeHeader):
+            return  # Stale parent pointer
         
         # Find this node's position in parent's children
         node_position = -1
-        all_children = parent_header.children + [parent_header.right_child_page_num]
+        all_children = [*parent_header.children, parent_header.right_child_page_num]
         for i, child in enumerate(all_children):
             if child == leaf_page_num:
                 node_position = i
@@ -480,26 +565,16 @@ class BTree:
         right_sibling_num = all_children[node_position + 1] if node_position < len(all_children) - 1 else None
         
         # Try to redistribute with left sibling first
-        if left_sibling_num is not None:
-            left_sibling_page = self.pager.get_page(left_sibling_num)
-            left_sibling_header = LeafNodeHeader.from_header(left_sibling_page)
-            
-            total_cells = leaf_header.num_cells + left_sibling_header.num_cells
-            if total_cells >= LEAF_NODE_MAX_CELLS:
-                # Can redistribute
-                self._redistribute_leaf_nodes(left_sibling_num, leaf_page_num)
-                return
+        if left_sibling_num is not None and not self._leaves_fit_in_one_page(left_sibling_num, leaf_page_num):
+            # Can redistribute
+            self._redistribute_leaf_nodes(left_sibling_num, leaf_page_num)
+            return
         
         # Try to redistribute with right sibling
-        if right_sibling_num is not None:
-            right_sibling_page = self.pager.get_page(right_sibling_num)
-            right_sibling_header = LeafNodeHeader.from_header(right_sibling_page)
-            
-            total_cells = leaf_header.num_cells + right_sibling_header.num_cells
-            if total_cells >= LEAF_NODE_MAX_CELLS:
-                # Can redistribute
-                self._redistribute_leaf_nodes(leaf_page_num, right_sibling_num)
-                return
+        if right_sibling_num is not None and not self._leaves_fit_in_one_page(leaf_page_num, right_sibling_num):
+            # Can redistribute
+            self._redistribute_leaf_nodes(leaf_page_num, right_sibling_num)
+            return
         
         # If we can't redistribute, merge with a sibling
         if left_sibling_num is not None:
@@ -507,78 +582,66 @@ class BTree:
         elif right_sibling_num is not None:
             self._merge_leaf_nodes(leaf_page_num, right_sibling_num)
 
+    def _leaves_fit_in_one_page(self, left_page_num: int, right_page_num: int) -> bool:
+        """Check whether the cells of two leaves could be merged into a single page"""
+        left_page = self.pager.get_page(left_page_num)
+        right_page = self.pager.get_page(right_page_num)
+        left_header = self.get_header(left_page_num)
+        right_header = self.get_header(right_page_num)
+        if left_header.num_cells + right_header.num_cells > LEAF_NODE_MAX_CELLS:
+            return False
+        used = self._leaf_used_bytes(left_page, left_header) + self._leaf_used_bytes(right_page, right_header)
+        return used <= self.pager.page_size - HEADER_PREFIX_SIZE
+
     def _redistribute_leaf_nodes(self, left_page_num: int, right_page_num: int):
         """Redistribute cells between two leaf nodes"""
-        left_page = bytearray(self.pager.get_page(left_page_num))
-        right_page = bytearray(self.pager.get_page(right_page_num))
-        left_header = LeafNodeHeader.from_header(left_page)
-        right_header = LeafNodeHeader.from_header(right_page)
-        
-        # Collect all cells from both nodes
-        all_cells = []
-        for ptr in left_header.cell_pointers:
-            cell_data = left_page[ptr:]
-            size = cell_size(cell_data)
-            all_cells.append((left_page[ptr:ptr+size], deserialize_key(cell_data)))
-        
-        for ptr in right_header.cell_pointers:
-            cell_data = right_page[ptr:]
-            size = cell_size(cell_data)
-            all_cells.append((right_page[ptr:ptr+size], deserialize_key(cell_data)))
-        
-        # Sort by key
-        all_cells.sort(key=lambda x: x[1])
-        
-        # Redistribute evenly
-        total_cells = len(all_cells)
-        left_count = total_cells // 2
-        right_count = total_cells - left_count
-        
-        # Clear both nodes
-        left_header.cell_pointers.clear()
-        left_header.num_cells = 0
-        left_header.allocation_pointer = self.pager.page_size
-        
-        right_header.cell_pointers.clear()
-        right_header.num_cells = 0
-        right_header.allocation_pointer = self.pager.page_size
-        
-        # Write headers
-        left_header_bytes = left_header.to_header()
-        left_page[:len(left_header_bytes)] = left_header_bytes
-        self.pager.write_page(left_page_num, bytes(left_page))
-        
-        right_header_bytes = right_header.to_header()
-        right_page[:len(right_header_bytes)] = right_header_bytes
-        self.pager.write_page(right_page_num, bytes(right_page))
-        
-        # Re-insert cells
-        for i, (cell, key) in enumerate(all_cells):
-            if i < left_count:
-                self.insert_cell_into_leaf_node(cell, left_page_num)
-            else:
-                self.insert_cell_into_leaf_node(cell, right_page_num)
+        left_page = self.pager.get_page(left_page_num)
+        right_page = self.pager.get_page(right_page_num)
+        left_header = self.get_header(left_page_num)
+        right_header = self.get_header(right_page_num)
+        
+        # Collect all cells from both nodes. Both leaves are sorted and every key
+        # in the left one is smaller, so the concatenation is already in key order
+        all_cells = self._leaf_cells(left_page, left_header) + self._leaf_cells(right_page, right_header)
+        
+        # Redistribute evenly by bytes, not by count, so neither half can outgrow its page
+        left_count = self._balanced_split_point([CELL_POINTER_SIZE + len(cell) for cell in all_cells])
+        
+        # Rewrite both nodes from scratch, which also drops the space of deleted cells
+        self._write_leaf(left_page_num, left_header, all_cells[:left_count])
+        self._write_leaf(right_page_num, right_header, all_cells[left_count:])
+
+        # The separator between the two siblings is the new max key of the left node
+        if left_count > 0 and left_header.parent_page_num != 0:
+            self._set_separator_key(left_header.parent_page_num, left_page_num, deserialize_key(all_cells[left_count - 1]))
+
+    def _set_separator_key(self, internal_page_num: int, child_page_num: int, key: int):
+        """Set the key that separates a child from its right sibling in an internal node"""
+        internal_page = self.pager.get_page(internal_page_num)
+        internal_header = InternalNodeHeader.from_header(internal_page)
+        if child_page_num not in internal_header.children:
+            return  # The right child has no separator key
+        internal_header.keys[internal_header.children.index(child_page_num)] = key
+        internal_header.write_into(internal_page)
+        self.pager.write_page(internal_page_num, internal_page)
 
     def _merge_leaf_nodes(self, left_page_num: int, right_page_num: int):
         """Merge two leaf nodes into the left node"""
-        left_page = bytearray(self.pager.get_page(left_page_num))
+        left_page = self.pager.get_page(left_page_num)
         right_page = self.pager.get_page(right_page_num)
-        left_header = LeafNodeHeader.from_header(left_page)
-        right_header = LeafNodeHeader.from_header(right_page)
+        left_header = self.get_header(left_page_num)
+        right_header = self.get_header(right_page_num)
         
-        # Move all cells from right to left
-        for ptr in right_header.cell_pointers:
-            cell_data = right_page[ptr:]
-            size = cell_size(cell_data)
-            cell = right_page[ptr:ptr+size]
-            self.insert_cell_into_leaf_node(cell, left_page_num)
+        # Rewrite the left node with the cells of both; the right node's keys are all larger
+        cells = self._leaf_cells(left_page, left_header) + self._leaf_cells(right_page, right_header)
+        self._write_leaf(left_page_num, left_header, cells)
         
         # Remove the right node from parent
         if left_header.parent_page_num != 0:
             self._remove_child_from_internal_node(left_header.parent_page_num, right_page_num)
         
-        # Mark right page as free (implementation depends on pager)
-        # For now, we'll just leave it as is
+        # Nothing points at the right node anymore, so its page can be reused
+        self.pager.free_page(right_page_num)
 
     def _handle_internal_underflow(self, internal_page_num: int):
         """Handle underflow in an internal node"""
@@ -600,20 +663,21 @@ class BTree:
 
     def _remove_child_from_internal_node(self, internal_page_num: int, child_page_num: int):
         """Remove a child pointer from an internal node"""
-        internal_page = bytearray(self.pager.get_page(internal_page_num))
+        internal_page = self.pager.get_page(internal_page_num)
         internal_header = InternalNodeHeader.from_header(internal_page)
         
         # Find and remove the child
-        all_children = internal_header.children + [internal_header.right_child_page_num]
+        all_children = [*internal_header.children, internal_header.right_child_page_num]
         if child_page_num in all_children:
             child_index = all_children.index(child_page_num)
             
             if child_index < len(internal_header.children):
                 # Child is in the children array
                 internal_header.children.pop(child_index)
-                if child_index < len(internal_header.keys):
-                    internal_header.keys.pop(child_index)
-                    internal_header.num_keys -= 1
+                # The child's keys now live in its left sibling, so drop the key that
+                # separated the two; the sibling inherits the removed child's key
+                internal_header.keys.pop(child_index - 1 if child_index > 0 else 0)
+                internal_header.num_keys -= 1
             else:
                 # Child is the right child
                 if len(internal_header.children) > 0:
@@ -625,11 +689,14 @@ class BTree:
                     internal_header.right_child_page_num = 0
             
             # Write updated header
-            header_bytes = internal_header.to_header()
-            internal_page[:len(header_bytes)] = header_bytes
-            self.pager.write_page(internal_page_num, bytes(internal_page))
-            self.pager.pages[internal_page_num] = internal_page
+            internal_header.write_into(internal_page)
+            self.pager.write_page(internal_page_num, internal_page)
             
+            # A root left with a single child is replaced by that child
+            if internal_header.is_root and internal_header.num_keys == 0:
+                self._promote_child_to_root(internal_header.right_child_page_num)
+                return
+
             # Check if this internal node now needs restructuring
             min_keys_threshold = INTERNAL_NODE_MAX_KEYS // 2
             if internal_header.num_keys < min_keys_threshold and not internal_header.is_root:
@@ -637,56 +704,57 @@ class BTree:
 
     def _promote_child_to_root(self, child_page_num: int):
         """Promote a child to become the new root"""
-        # Move the child page content to the root page
-        child_page = self.pager.get_page(child_page_num)
-        root_page = bytearray(self.pager.page_size)
-        root_page[:] = child_page[:]
-        
-        # Update the header to mark it as root
-        node_type = get_node_type(child_page)
-        if node_type == NodeType.LEAF:
-            header = LeafNodeHeader.from_header(root_page)
-            header.is_root = True
-            header.parent_page_num = 0
-            header_bytes = header.to_header()
-            root_page[:len(header_bytes)] = header_bytes
-        else:
-            header = InternalNodeHeader.from_header(root_page)
-            header.is_root = True
-            header.parent_page_num = 0
-            header_bytes = header.to_header()
-            root_page[:len(header_bytes)] = header_bytes
-        
-        # Write the new root
-        self.pager.write_page(self.root_page_num, bytes(root_page))
+        # Copy the child over the root page, so the root keeps the page number the catalog knows it by
+        root_page = bytearray(self.pager.get_page(child_page_num))
+        header = parse_header(root_page)
+        header.is_root = True
+        header.parent_page_num = 0
+        header.write_into(root_page)
+        self.pager.write_page(self.root_page_num, root_page)
+        if isinstance(header, InternalNodeHeader):
+            # The grandchildren still name the child's page as their parent
+            for grandchild_page_num in [*header.children, header.right_child_page_num]:
+                self._set_parent_page_num(grandchild_page_num, self.root_page_num)
+        # Nothing points at the child's page anymore, so it can be reused
+        self.pager.free_page(child_page_num)
 
     def left_most_leaf_node(self) -> int:
         page_num = self.root_page_num
-        while get_node_type(self.pager.get_page(page_num)) != NodeType.LEAF:
-            # Get the leftmost child page number from the internal node header
-            # For internal nodes, the first child pointer (leftmost) is stored at bytes 20-24
-            # Bytes 16-20 contain the right_child_page_num which is incorrect for finding leftmost child
-            page_bytes = self.pager.get_page(page_num)[20:24]  # First child pointer in children array
-            page_num = Integer.deserialize(page_bytes)
+        while not is_leaf(self.pager.get_page(page_num)):
+            # The leftmost child is the first entry of the children array, which follows the keys;
+            # a node without keys only has its right child
+            header = self.get_header(page_num)
+            page_num = header.children[0] if header.num_keys > 0 else header.right_child_page_num
         return page_num
 
+    def get_header(self, page_num: int):
+        """
+        Parse the header of a page, reusing the previous parse until the page is written.
+        The returned header is shared, so callers must not mutate it.
+        """
+        header = self.pager.headers.get(page_num)
+        if header is None:
+            header = parse_header(self.pager.get_page(page_num))
+            self.pager.headers[page_num] = header
+        return header
+
     # private APIs
     def _rebuild_children(self, header):
         # Helper to rebuild children and right_child_page_num from all children
-        all_children = header.children + [header.right_child_page_num]
+        all_children = [*header.children, header.right_child_page_num]
         all_children = [c for c in all_children if c != 0]
 
         # For an internal node with n keys, we need n+1 children total
         # children should have n elements, right_child_page_num should be the (n+1)th element
         if len(all_children) >= header.num_keys + 1:
-            header.children = all_children[:header.num_keys]
+            header.children = array("i", all_children[:header.num_keys])
             header.right_child_page_num = all_children[header.num_keys]
         else:
             # Not enough children, this is an error state
-            print(f"[ERROR] _rebuild_children: not enough children for {header.num_keys} keys, all_children={all_children}")
+            logger.error("_rebuild_children: not enough children for %d keys, all_children=%s", header.num_keys, all_children)
             # This should not happen in normal operation. If it does, it indicates a bug in the split logic.
             # For now, we'll set the node to have no children and let the caller handle it.
-            header.children = []
+            header.children = array("i")
             header.right_child_page_num = 0
             header.num_keys = 0
 
@@ -697,16 +765,10 @@ class BTree:
         # Get the maximum key from the left child to use as the separator key
         left_child_page = self.pager.get_page(left_node_page_num)
         left_child_header = LeafNodeHeader.from_header(left_child_page)
-        separator_key = 0  # Default value
-        if left_child_header.num_cells > 0:
-            # Find the maximum key in the left child
-            max_key = None
-            for ptr in left_child_header.cell_pointers:
-                cell_data = left_child_page[ptr:]
-                cell_key = deserialize_key(cell_data)
-                if max_key is None or cell_key > max_key:
-                    max_key = cell_key
-            separator_key = max_key
+        # The separator is the maximum key in the left child
+        separator_key = left_child_header.max_key(left_child_page)
+        if separator_key is None:
+            separator_key = 0  # Default value
 
         root_header = InternalNodeHeader(
             is_root=True,
@@ -716,172 +778,175 @@ class BTree:
             keys=[separator_key],  # The separator key
             children=[left_node_page_num]  # Only left child in children list
         )
-        header_bytes = root_header.to_header()
-        root_page[:len(header_bytes)] = header_bytes
-        self.pager.write_page(root_page_num, bytes(root_page))
+        root_header.write_into(root_page)
+        self.pager.write_page(root_page_num, root_page)
 
         # Update parent pointers of all children (including right child)
         for child_page_num in root_header.children:
-            child_page = bytearray(self.pager.get_page(child_page_num))
-            if get_node_type(child_page) == NodeType.LEAF:
+            child_page = self.pager.get_page(child_page_num)
+            if is_leaf(child_page):
                 child_header = LeafNodeHeader.from_header(child_page)
                 child_header.parent_page_num = root_page_num
                 child_header.is_root = False
-                child_page[:len(child_header.to_header())] = child_header.to_header()
+                child_header.write_into(child_page)
             else:
                 child_header = InternalNodeHeader.from_header(child_page)
                 child_header.parent_page_num = root_page_num
                 child_header.is_root = False
-                child_page[:len(child_header.to_header())] = child_header.to_header()
-            self.pager.write_page(child_page_num, bytes(child_page))
-            self.pager.pages[child_page_num] = child_page
+                child_header.write_into(child_page)
+            self.pager.write_page(child_page_num, child_page)
         return root_page_num
 
     def split_internal_node(self, page_num: int, new_child_page_num: int, new_child_key: int):
-        old_page = self.pager.get_page(page_num)
-        old_header = InternalNodeHeader.from_header(old_page)
-
-        # Build the full list of children
-        full_children = old_header.children + [old_header.right_child_page_num]
-        # Insert the new child in the correct position
-        insert_pos = 0
-        while insert_pos < len(old_header.keys) and new_child_key > old_header.keys[insert_pos]:
-            insert_pos += 1
-        old_header.keys.insert(insert_pos, new_child_key)
-        full_children.insert(insert_pos + 1, new_child_page_num)
-        old_header.num_keys = len(old_header.keys)
-
-        # Split evenly
-        mid = old_header.num_keys // 2
-        separator_key = old_header.keys[mid]
-        left_keys = old_header.keys[:mid]
-        right_keys = old_header.keys[mid+1:]
-        left_children = full_children[:mid+1]
-        right_children = full_children[mid+1:]
-
-        # Ensure correct number of children for each side
-        if len(left_children) != len(left_keys) + 1:
-            raise Exception(f"Internal node split error: left_children count {len(left_children)} does not match left_keys+1 {len(left_keys)+1}. full_children={full_children}, mid={mid}, old_header.keys={old_header.keys}")
-        if len(right_children) != len(right_keys) + 1:
-            raise Exception(f"Internal node split error: right_children count {len(right_children)} does not match right_keys+1 {len(right_keys)+1}. full_children={full_children}, mid={mid}, old_header.keys={old_header.keys}")
-
-        # Assign children and right_child for left node
-        old_header.keys = left_keys
-        old_header.children = left_children[:-1]
-        old_header.num_keys = len(left_keys)
-        old_header.right_child_page_num = left_children[-1]
-        old_header_bytes = old_header.to_header()
-        old_page[:len(old_header_bytes)] = old_header_bytes
-        self.pager.write_page(page_num, bytes(old_page))
-
-        # Assign children and right_child for right node
-        new_page_num = self.pager.get_free_page()
-        new_page = bytearray(self.pager.page_size)
-        new_header = InternalNodeHeader(
-            is_root=False,
-            parent_page_num=old_header.parent_page_num,
-            num_keys=len(right_keys),
-            right_child_page_num=right_children[-1],
-            keys=right_keys,
-            children=right_children[:-1]
-        )
-        new_header_bytes = new_header.to_header()
-        new_page[:len(new_header_bytes)] = new_header_bytes
-        self.pager.write_page(new_page_num, bytes(new_page))
-
-        for child_page_num in right_children:
-            child_page = bytearray(self.pager.get_page(child_page_num))
-            if get_node_type(child_page) == NodeType.LEAF:
-                child_header = LeafNodeHeader.from_header(child_page)
-                child_header.parent_page_num = new_page_num
-                child_page[:len(child_header.to_header())] = child_header.to_header()
+        """
+        Add a child to a full internal node by splitting the node and pushing the separator up.
+        Splits cascade up the tree, one loop iteration per level, for as long as the parent is full too.
+        Returns the new root page number if the root was split.
+        """
+        while True:
+            old_page = self.pager.get_page(page_num)
+            old_header = InternalNodeHeader.from_header(old_page)
+
+            # Build the full list of children
+            full_children = [*old_header.children, old_header.right_child_page_num]
+            # Insert the new child in the correct position
+            insert_pos = bisect.bisect_left(old_header.keys, new_child_key)
+            old_header.keys.insert(insert_pos, new_child_key)
+            full_children.insert(insert_pos + 1, new_child_page_num)
+            old_header.num_keys = len(old_header.keys)
+
+            # Split evenly
+            mid = old_header.num_keys // 2
+            separator_key = old_header.keys[mid]
+            left_keys = old_header.keys[:mid]
+            right_keys = old_header.keys[mid+1:]
+            left_children = full_children[:mid+1]
+            right_children = full_children[mid+1:]
+
+            # Ensure correct number of children for each side
+            if len(left_children) != len(left_keys) + 1:
+                raise Exception(f"Internal node split error: left_children count {len(left_children)} does not match left_keys+1 {len(left_keys)+1}. full_children={full_children}, mid={mid}, old_header.keys={old_header.keys}")
+            if len(right_children) != len(right_keys) + 1:
+                raise Exception(f"Internal node split error: right_children count {len(right_children)} does not match right_keys+1 {len(right_keys)+1}. full_children={full_children}, mid={mid}, old_header.keys={old_header.keys}")
+
+            # Allocate the new node (and a new root when the root splits) first, so that
+            # both halves are written once with their final parent
+            new_page_num = self.pager.get_free_page()
+            split_root = old_header.is_root
+            if split_root:
+                new_root_page_num = self.pager.get_free_page()
+                parent_page_num = new_root_page_num
             else:
-                child_header = InternalNodeHeader.from_header(child_page)
-                child_header.parent_page_num = new_page_num
-                child_page[:len(child_header.to_header())] = child_header.to_header()
-            self.pager.write_page(child_page_num, bytes(child_page))
-            self.pager.pages[child_page_num] = child_page
+                parent_page_num = old_header.parent_page_num
 
-        if old_header.is_root:
-            new_root_page_num = self.pager.get_free_page()
-            new_root_page = bytearray(self.pager.page_size)
-            new_root_header = InternalNodeHeader(
-                is_root=True,
-                parent_page_num=0,
-                num_keys=1,
-                right_child_page_num=new_page_num,
-                keys=[separator_key],
-                children=[page_num]
-            )
-            new_root_header_bytes = new_root_header.to_header()
-            new_root_page[:len(new_root_header_bytes)] = new_root_header_bytes
-            self.pager.write_page(new_root_page_num, bytes(new_root_page))
-            old_header.parent_page_num = new_root_page_num
+            # Assign children and right_child for left node
             old_header.is_root = False
-            old_header_bytes = old_header.to_header()
-            old_page[:len(old_header_bytes)] = old_header_bytes
-            self.pager.write_page(page_num, bytes(old_page))
-            new_header_bytes = new_header.to_header()
-            new_page[:len(new_header_bytes)] = new_header_bytes
-            self.pager.write_page(new_page_num, bytes(new_page))
-            self.root_page_num = new_root_page_num
-        else:
-            return self.split_internal_node(old_header.parent_page_num, new_page_num, separator_key)
-
-    def split_leaf_node(self, page_num: int):
+            old_header.parent_page_num = parent_page_num
+            old_header.keys = left_keys
+            old_header.children = array("i", left_children[:-1])
+            old_header.num_keys = len(left_keys)
+            old_header.right_child_page_num = left_children[-1]
+            old_header.write_into(old_page)
+            self.pager.write_page(page_num, old_page)
+
+            # Assign children and right_child for right node
+            new_page = bytearray(self.pager.page_size)
+            new_header = InternalNodeHeader(
+                is_root=False,
+                parent_page_num=parent_page_num,
+                num_keys=len(right_keys),
+                right_child_page_num=right_children[-1],
+                keys=right_keys,
+                children=right_children[:-1]
+            )
+            new_header.write_into(new_page)
+            self.pager.write_page(new_page_num, new_page)
+
+            for child_page_num in right_children:
+                self._set_parent_page_num(child_page_num, new_page_num)
+
+            if split_root:
+                new_root_page = bytearray(self.pager.page_size)
+                new_root_header = InternalNodeHeader(
+                    is_root=True,
+                    parent_page_num=0,
+                    num_keys=1,
+                    right_child_page_num=new_page_num,
+                    keys=[separator_key],
+                    children=[page_num]
+                )
+                new_root_header.write_into(new_root_page)
+                self.pager.write_page(new_root_page_num, new_root_page)
+                self.root_page_num = new_root_page_num
+                return new_root_page_num
+
+            # Hand the new node and its separator to the parent, which only splits in turn if it is full
+            if self.get_header(parent_page_num).num_keys < INTERNAL_NODE_MAX_KEYS:
+                self._insert_child_into_internal_node(parent_page_num, new_page_num, separator_key)
+                return None
+            page_num, new_child_page_num, new_child_key = parent_page_num, new_page_num, separator_key
+
+    def _insert_child_into_internal_node(self, page_num: int, child_page_num: int, key: int):
+        """Add a child, and the key that separates it from the child on its left, to an internal node with room for it"""
+        page = self.pager.get_page(page_num)
+        header = InternalNodeHeader.from_header(page)
+        # The key goes before the first key that is >= it, and the child right after that key's left child
+        insert_pos = bisect.bisect_left(header.keys, key)
+        header.keys.insert(insert_pos, key)
+        header.num_keys += 1
+        # Insert new child into children/right_child
+        full_children = [*header.children, header.right_child_page_num]
+        full_children.insert(insert_pos + 1, child_page_num)
+        header.children = array("i", full_children[:-1])
+        header.right_child_page_num = full_children[-1]
+        header.write_into(page)
+        self.pager.write_page(page_num, page)
+
+    def split_leaf_node(self, page_num: int, key: int = None, cell_length: int = 0) -> int:
+        """
+        Split a full leaf into itself and a new right sibling, linking the new leaf into the parent.
+        The split point balances the bytes of the two halves, counting the incoming cell of
+        cell_length bytes at key's position.
+        Returns the leaf that key now belongs to (the old one if key is None).
+        """
         old_page_num = page_num
-        old_header = LeafNodeHeader.from_header(self.pager.get_page(page_num))
         old_page = self.pager.get_page(old_page_num)
-        # Make a copy of the cell pointers to use for splitting
-        cell_pointers_copy = list(old_header.cell_pointers)
-        # Sort cell_pointers by key before splitting
-        cell_ptrs_with_keys = [(ptr, deserialize_key(old_page[ptr:])) for ptr in cell_pointers_copy]
-        cell_ptrs_with_keys.sort(key=lambda x: x[1])
-        sorted_cell_pointers = [ptr for ptr, key in cell_ptrs_with_keys]
-        sorted_keys = [key for ptr, key in cell_ptrs_with_keys]
-        # Allocate new page for the split BEFORE moving cells
+        old_header = LeafNodeHeader.from_header(old_page)
+        # Cells are kept sorted by key, so the split point is just an index
+        cells = self._leaf_cells(old_page, old_header)
+        sizes = [CELL_POINTER_SIZE + len(cell) for cell in cells]
+        if key is not None:
+            key_index = self.find_cell(old_page, key)
+            sizes.insert(key_index, CELL_POINTER_SIZE + cell_length)
+        split = self._balanced_split_point(sizes)
+        if key is None:
+            left_count = split
+            separator_key = deserialize_key(cells[left_count - 1]) if cells else 0
+        elif split > key_index:
+            # The incoming cell goes left; it is the left leaf's max key if nothing stays after it
+            left_count = split - 1
+            separator_key = deserialize_key(cells[left_count - 1]) if left_count > key_index else key
+        else:
+            left_count = split
+            separator_key = deserialize_key(cells[left_count - 1])
+        # Allocate the new page (and a new root when the root splits) first, so that
+        # each leaf is written once with its final parent
         new_page_num = self.pager.get_free_page()
-        new_page = bytearray(self.pager.page_size)
-        new_header = LeafNodeHeader(is_root=False, parent_page_num=old_header.parent_page_num, num_cells=0, allocation_pointer=self.pager.page_size, cell_pointers=[])
-        new_header_bytes = new_header.to_header()
-        new_page[:len(new_header_bytes)] = new_header_bytes
-        self.pager.write_page(new_page_num, bytes(new_page))
-        # Move cells to new page BEFORE updating the old page header or writing the page
-        pointers_to_move = sorted_cell_pointers[LEAF_NODE_LEFT_SPLIT_COUNT:]
-        keys_to_move = [deserialize_key(old_page[ptr:]) for ptr in pointers_to_move]
-        for ptr in pointers_to_move:
-            cell_data = old_page[ptr:]
-            size = cell_size(cell_data)
-            cell = old_page[ptr:ptr+size]
-            self.insert_cell_into_leaf_node(cell, new_page_num)
-        # Update old page header with remaining cells
-        old_header.cell_pointers = sorted_cell_pointers[:LEAF_NODE_LEFT_SPLIT_COUNT]
-        old_header.num_cells = LEAF_NODE_LEFT_SPLIT_COUNT
-        if old_header.cell_pointers:
-            old_header.allocation_pointer = min(old_header.cell_pointers)
+        if old_header.is_root:
+            new_root_page_num = self.pager.get_free_page()
+            parent_page_num = new_root_page_num
         else:
-            old_header.allocation_pointer = self.pager.page_size
-        left_keys_after = [deserialize_key(old_page[ptr:]) for ptr in old_header.cell_pointers]
-        old_header_bytes = old_header.to_header()
-        old_page[:len(old_header_bytes)] = old_header_bytes
-        self.pager.write_page(old_page_num, bytes(old_page))
-        # Re-fetch the new page and header after all insertions
-        new_page = self.pager.get_page(new_page_num)
-        new_header = LeafNodeHeader.from_header(new_page)
-        new_keys = [deserialize_key(new_page[ptr:]) for ptr in new_header.cell_pointers]
-        # If parent is internal, print its keys and children
-        if old_header.parent_page_num != 0:
-            parent_page = self.pager.get_page(old_header.parent_page_num)
-            if get_node_type(parent_page) == NodeType.INTERNAL:
-                parent_header = InternalNodeHeader.from_header(parent_page)
+            parent_page_num = old_header.parent_page_num
+        leaf_header = LeafNodeHeader(is_root=False, parent_page_num=parent_page_num, num_cells=0, allocation_pointer=self.pager.page_size, cell_pointers=[])
+        # Move the upper half of the cells to the new page as raw bytes, and rewrite the old page
+        # with the cells that stay, which also drops the space of deleted cells
+        self._write_leaf(new_page_num, leaf_header, cells[left_count:])
+        self._write_leaf(old_page_num, leaf_header, cells[:left_count])
 
         # Implement comprehensive split logic for both root and non-root cases
         if old_header.is_root:
             # Create a new root internal node
-            new_root_page_num = self.pager.get_free_page()
             new_root_page = bytearray(self.pager.page_size)
-            # The separator key is the max key in the left (old) leaf
-            separator_key = max(left_keys_after) if left_keys_after else 0
             new_root_header = InternalNodeHeader(
                 is_root=True,
                 parent_page_num=0,
@@ -890,71 +955,115 @@ class BTree:
                 keys=[separator_key],
                 children=[old_page_num]
             )
-            new_root_header_bytes = new_root_header.to_header()
-            new_root_page[:len(new_root_header_bytes)] = new_root_header_bytes
-            self.pager.write_page(new_root_page_num, bytes(new_root_page))
-            # Update old and new leaf headers to point to new root
-            old_header.parent_page_num = new_root_page_num
-            old_header.is_root = False
-            old_header_bytes = old_header.to_header()
-            old_page[:len(old_header_bytes)] = old_header_bytes
-            self.pager.write_page(old_page_num, bytes(old_page))
-            new_header.parent_page_num = new_root_page_num
-            new_header_bytes = new_header.to_header()
-            new_page[:len(new_header_bytes)] = new_header_bytes
-            self.pager.write_page(new_page_num, bytes(new_page))
+            new_root_header.write_into(new_root_page)
+            self.pager.write_page(new_root_page_num, new_root_page)
             self.root_page_num = new_root_page_num
         else:
             # Insert new child and separator key into parent internal node
-            parent_page_num = old_header.parent_page_num
-            parent_page = self.pager.get_page(parent_page_num)
-            parent_header = InternalNodeHeader.from_header(parent_page)
-            # The separator key is the max key in the left (old) leaf
-            separator_key = max(left_keys_after) if left_keys_after else 0
-            # Insert new child and key into parent
-            if parent_header.num_keys < INTERNAL_NODE_MAX_KEYS:
-                # Insert into parent directly
-                insert_pos = 0
-                while insert_pos < len(parent_header.keys) and separator_key > parent_header.keys[insert_pos]:
-                    insert_pos += 1
-                parent_header.keys.insert(insert_pos, separator_key)
-                parent_header.num_keys += 1
-                # Insert new child into children/right_child
-                full_children = parent_header.children + [parent_header.right_child_page_num]
-                full_children.insert(insert_pos + 1, new_page_num)
-                parent_header.children = full_children[:-1]
-                parent_header.right_child_page_num = full_children[-1]
-                parent_header_bytes = parent_header.to_header()
-                parent_page[:len(parent_header_bytes)] = parent_header_bytes
-                self.pager.write_page(parent_page_num, bytes(parent_page))
+            if self.get_header(parent_page_num).num_keys < INTERNAL_NODE_MAX_KEYS:
+                self._insert_child_into_internal_node(parent_page_num, new_page_num, separator_key)
             else:
-                # Parent is full, split parent recursively
-                new_root_page_num = self.split_internal_node(parent_page_num, new_page_num, separator_key)
-                if new_root_page_num is not None:
-                    self.root_page_num = new_root_page_num
+                # Parent is full, split it (and its ancestors, as far as they are full too)
+                self.split_internal_node(parent_page_num, new_page_num, separator_key)
+        return old_page_num if key is None or key <= separator_key else new_page_num
 
-    def insert_cell_into_leaf_node(self, cell: Cell, page_num: int):
-        page = bytearray(self.pager.get_page(page_num))
-        header = LeafNodeHeader.from_header(page)
+    @staticmethod
+    def _balanced_split_point(sizes: list[int]) -> int:
+        """
+        Index that splits sizes into two non-empty runs with the smaller larger half,
+        preferring the left run on ties so the old leaf keeps the extra cell
+        """
+        if len(sizes) < 2:
+            return len(sizes)
+        total = sum(sizes)
+        best, best_max = 1, None
+        left = 0
+        for i in range(1, len(sizes)):
+            left += sizes[i - 1]
+            larger = max(left, total - left)
+            if best_max is None or larger <= best_max:
+                best, best_max = i, larger
+            if left >= total - left:
+                break
+        return best
+
+    def _set_parent_page_num(self, page_num: int, parent_page_num: int):
+        """Point a node at a new parent by patching that one header field in the cached page"""
+        _PARENT_PAGE_NUM.pack_into(self.pager.get_page_mut(page_num), _PARENT_PAGE_NUM_OFFSET, parent_page_num)
+        # Only those 4 bytes changed, so only they go to the file
+        self.pager.flush_page(page_num, _PARENT_PAGE_NUM_OFFSET, _PARENT_PAGE_NUM_OFFSET + _PARENT_PAGE_NUM.size)
+
+    def insert_cell_into_leaf_node(self, cell: Cell, page_num: int, key: int = None):
+        result = self._place_cell_in_leaf(cell, page_num, key)
+        self.pager.flush_page(page_num)
+        return result
 
-        cell_offset = header.allocation_pointer - len(cell)
-        if cell_offset < 0:
-            raise Exception("Cell offset is negative. Not enough space in page.")
+    def _place_cell_in_leaf(self, cell: Cell, page_num: int, key: int = None):
+        # Write straight into the pager's copy of the page; the caller flushes it
+        return self._place_cell(self.pager.get_page_mut(page_num), cell, key)
+
+    def _place_cell(self, page: bytearray | memoryview, cell: Cell, key: int = None):
+        """
+        Add a cell to a leaf page buffer, keeping cell_pointers sorted by key and updating the header in place.
+        Callers that already decoded the cell's key pass it in so it is not decoded again.
+        """
+        _, _, num_cells, allocation_pointer = _HEADER_PREFIX.unpack_from(page)
+        if key is None:
+            key = deserialize_key(cell)
+        index = self.find_cell(page, key)
+
+        # allocation_pointer is the lowest allocated byte, so the new cell goes right below it
+        # without scanning cell_pointers; an empty leaf can reuse the whole page body
+        if num_cells == 0:
+            allocation_pointer = self.pager.page_size
+        cell_offset = allocation_pointer - len(cell)
+        if cell_offset < LeafNodeHeader.header_size(num_cells + 1):
+            raise Exception("Not enough space in page for the cell and its pointer.")
 
         page[cell_offset:cell_offset + len(cell)] = cell
 
-        header.num_cells += 1
-        header.cell_pointers.append(cell_offset)
-        header.allocation_pointer = cell_offset
-        header_bytes = header.to_header()
-        page[:len(header_bytes)] = header_bytes
-        self.pager.write_page(page_num, bytes(page))
-        self.pager.pages[page_num] = page
+        # Only the cell pointers from index on, num_cells and allocation_pointer change,
+        # so patch those in place instead of re-serializing the whole header
+        pointer_offset = LeafNodeHeader.header_size(index)
+        pointers_end = LeafNodeHeader.header_size(num_cells)
+        if index < num_cells:
+            page[pointer_offset + CELL_POINTER_SIZE:pointers_end + CELL_POINTER_SIZE] = bytes(page[pointer_offset:pointers_end])
+        _CELL_POINTER.pack_into(page, pointer_offset, cell_offset)
+        _LEAF_COUNTS.pack_into(page, _LEAF_COUNTS_OFFSET, num_cells + 1, cell_offset)
 
         # Return the position and length
         return cell_offset, len(cell)
 
-    def insert_into_leaf_node(self, cell: Cell, page_num: int):
-        return self.insert_cell_into_leaf_node(cell, page_num)
+    def _leaf_has_room(self, page: bytearray | memoryview, cell_length: int) -> bool:
+        """Check whether a cell of the given length can be placed in a leaf without compacting or splitting it"""
+        _, _, num_cells, allocation_pointer = _HEADER_PREFIX.unpack_from(page)
+        if num_cells >= LEAF_NODE_MAX_CELLS:
+            return False
+        if num_cells == 0:
+            allocation_pointer = self.pager.page_size
+        return allocation_pointer - cell_length >= LeafNodeHeader.header_size(num_cells + 1)
+
+    def _leaf_used_bytes(self, page: bytearray | memoryview, header: LeafNodeHeader) -> int:
+        """Bytes taken by the live cells of a leaf and their pointers, ignoring space left by deleted cells"""
+        view = memoryview(page)
+        return sum(CELL_POINTER_SIZE + cell_size(view[ptr:]) for ptr in header.cell_pointers)
+
+    def _leaf_cells(self, page: bytearray | memoryview, header: LeafNodeHeader) -> list[bytes]:
+        """Copy out the cells of a leaf in key order"""
+        view = memoryview(page)
+        cells = []
+        for ptr in header.cell_pointers:
+            cell_data = view[ptr:]
+            cells.append(bytes(cell_data[:cell_size(cell_data)]))
+        return cells
+
+    def _write_leaf(self, page_num: int, header: LeafNodeHeader, cells: list[bytes]):
+        """Write a leaf from scratch with the given cells (in key order), keeping the root flag and parent of header"""
+        page = bytearray(self.pager.page_size)
+        LeafNodeHeader(is_root=header.is_root, parent_page_num=header.parent_page_num, num_cells=0,
+                       allocation_pointer=self.pager.page_size, cell_pointers=[]).write_into(page)
+        for cell in cells:
+            self._place_cell(page, cell)
+        self.pager.write_page(page_num, page)
 
 
@@ -1,7 +1,11 @@
+import logging
 import sys
 from typing import Optional
 from pager import Pager
-from btree import BTree, InternalNodeHeader, LeafNodeHeader, NodeType, get_node_type
+from record import cell_size
+from btree import BTree, InternalNodeHeader, is_leaf
+
+logger = logging.getLogger(__name__)
 
 """
 Cursor abstrats the B-tree structure and provides a way to iterate over the cells in the tree.
@@ -10,8 +14,8 @@ Since each table is a b-tree, a cursor can be used to iterate over the cells in
 [Low Address] ←→ [High Address]
 +-------------------------------------------------------------------+
 | Header (Fixed Size)                                               |
-| +- Node Type (4B)                                                 |
-| +- Is Root (4B)                                                   |
+| +- Flags (1B): bit 0 is root, bit 1 leaf node                     |
+| +- Reserved (3B)                                                  |
 | +- Parent Pointer (4B)                                            |
 | +- Number of Cells (4B)                                           |
 | +- Allocation Pointer (4B)                                        |
@@ -32,7 +36,7 @@ Since each table is a b-tree, a cursor can be used to iterate over the cells in
 +-------------------------------------------------------------------+
 """
 def num_cells(page: bytes) -> int:
-    return int.from_bytes(page[16:20], sys.byteorder)
+    return int.from_bytes(page[8:12], sys.byteorder)
 
 class Cursor:
     def __init__(self, pager: Pager, tree: BTree):
@@ -47,8 +51,7 @@ class Cursor:
         if self.end_of_table:
             return
 
-        page = self.pager.get_page(self.page_num)
-        header = LeafNodeHeader.from_header(bytes(page))
+        header = self.tree.get_header(self.page_num)
 
         self.cell_num += 1
         if self.cell_num >= header.num_cells:
@@ -60,22 +63,23 @@ class Cursor:
 
     def get_cell(self):
         page = self.pager.get_page(self.page_num)
-        header = LeafNodeHeader.from_header(bytes(page))
+        header = self.tree.get_header(self.page_num)
 
         # Check if we're at the end of the current page or if the page is empty
         if self.cell_num >= header.num_cells or header.num_cells == 0:
             return b''  # Return empty bytes if no more cells or empty page
 
+        # Copy just this cell rather than everything up to the end of the page
         cell_offset = header.cell_pointers[self.cell_num]
-        return page[cell_offset:]
+        return page[cell_offset:cell_offset + cell_size(memoryview(page)[cell_offset:])]
 
     # private methods
     def navigate_to_first_leaf_node(self, page_num: Optional[int] = None):
         if page_num is None:
             page_num = self.page_num
         page = self.pager.get_page(page_num)
-        while get_node_type(bytes(page)) != NodeType.LEAF:
-            header = InternalNodeHeader.from_header(bytes(page))
+        while not is_leaf(page):
+            header = self.tree.get_header(page_num)
             if len(header.children) == 0:
                 # If no children in children array, use right_child_page_num
                 if header.right_child_page_num == 0:
@@ -85,25 +89,23 @@ class Cursor:
                 page_num = header.right_child_page_num
             else:
                 page_num = header.children[0]
+                # A scan visits the remaining children next, so let their reads start now
+                for sibling_page_num in header.children[1:]:
+                    self.pager.prefetch(sibling_page_num)
+                self.pager.prefetch(header.right_child_page_num)
             page = self.pager.get_page(page_num)
         self.page_num = page_num  # Set to the leftmost leaf node after traversal
 
     def navigate_to_next_leaf_node(self):
-        page = self.pager.get_page(self.page_num)
-        node_type = get_node_type(bytes(page))
-        if node_type == NodeType.LEAF:
-            header = LeafNodeHeader.from_header(bytes(page))
-            parent_page_num = header.parent_page_num
-        else:
-            header = InternalNodeHeader.from_header(bytes(page))
-            parent_page_num = header.parent_page_num
+        header = self.tree.get_header(self.page_num)
+        parent_page_num = header.parent_page_num
         if header.is_root:
             self.end_of_table = True
             return None
 
         current_page_num = self.page_num
         while True:
-            parent_header = InternalNodeHeader.from_header(bytes(self.pager.get_page(parent_page_num)))
+            parent_header = InternalNodeHeader.from_header(self.pager.get_page(parent_page_num))
 
             # Check if current page is the right child
             if current_page_num == parent_header.right_child_page_num:
@@ -154,7 +156,7 @@ class Cursor:
 
             if not found_in_children:
                 # Current page is not found in children array, this shouldn't happen
-                print(f"[ERROR] navigate_to_next_leaf_node: current_page_num {current_page_num} not found in parent {parent_page_num}")
+                logger.error("navigate_to_next_leaf_node: current_page_num %d not found in parent %d", current_page_num, parent_page_num)
                 self.end_of_table = True
                 return None
 
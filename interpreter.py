@@ -1,10 +1,13 @@
 # Interpreter evalautes the expressions, currently used for where clause
 
+import logging
 from typing import Any
 from record import Record
 from symbols import *
 from visitor import Visitor
 
+logger = logging.getLogger(__name__)
+
 class Interpreter(Visitor):
 
     def __init__(self, record: Optional[Record] = None):
@@ -53,7 +56,7 @@ class Interpreter(Visitor):
         pass
 
     def visit_or_clause(self, expr: OrClause) -> Any:
-        print("interpreter or clause", expr)
+        logger.debug("interpreter or clause %s", expr)
         for and_clause in expr.and_clauses:
             if self.evaluate(and_clause):
                 return True
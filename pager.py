@@ -1,14 +1,17 @@
 # Pager is a module that provides a pager for the database.
 # A record is a Python object that is deserialized from a cell. A cell is a serialized record.
+import logging
 import os
 
+from schema.datatypes import Integer
 
-from record import Record, serialize, deserialize
-from schema.basic_schema import BasicSchema, Column
-from schema.datatypes import Integer, Text
+logger = logging.getLogger(__name__)
 
 PAGE_SIZE = 4096
 TABLE_MAX_PAGES = 100
+# Stored in the file header; bumped whenever the on-disk page layout changes,
+# and files written with any other version are refused
+FILE_FORMAT_VERSION = "kdb002"
 
 
 class DatabaseFileHeader:
@@ -48,14 +51,18 @@ class Pager:
                 self.num_pages = 0
 
         self.pages = [None] * TABLE_MAX_PAGES
+        # page_num -> parsed node header, dropped whenever the page is written
+        self.headers = {}
 
         self.file_header = self.read_file_header()
-        self.recycled_pages = []  # the pages that are not used (e.g. deleted entries)
+        self.recycled_pages = []  # the pages that are not used (e.g. deleted entries); the last one is reused first
         self.init_pages()
+        self.load_free_list()
 
     def init_pages(self):
-        for i in range(self.num_pages):
-            self.get_page(i)
+        # Pages are read lazily by get_page; ask the OS to start reading the whole file in the background
+        if self.num_pages > 0 and hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.file_ptr.fileno(), 100, self.num_pages * PAGE_SIZE, os.POSIX_FADV_WILLNEED)
 
     @property
     def page_size(self):
@@ -65,37 +72,96 @@ class Pager:
         if page_num >= TABLE_MAX_PAGES:
             return bytearray(self.page_size)
         if self.pages[page_num] is None:
+            page = bytearray(PAGE_SIZE)
             if page_num < self.num_pages:
-                self.file_ptr.seek(100 + page_num * PAGE_SIZE)  # 100 for file header
-                self.pages[page_num] = bytearray(self.file_ptr.read(PAGE_SIZE))
-            else:
-                self.pages[page_num] = bytearray(PAGE_SIZE)
+                # Read straight into the cached buffer instead of going through an intermediate bytes object
+                self._read_into(page, 100 + page_num * PAGE_SIZE)  # 100 for file header
+            self.pages[page_num] = page
         return self.pages[page_num]
 
+    def prefetch(self, page_num):
+        """Hint the OS to start reading a page that will be needed soon but is not cached yet."""
+        if page_num >= min(self.num_pages, TABLE_MAX_PAGES) or self.pages[page_num] is not None:
+            return
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.file_ptr.fileno(), 100 + page_num * PAGE_SIZE, PAGE_SIZE, os.POSIX_FADV_WILLNEED)
+
+    def get_page_mut(self, page_num) -> memoryview:
+        """Return a writable view of the cached page. Call flush_page after mutating it."""
+        self.headers.pop(page_num, None)
+        return memoryview(self.get_page(page_num))
+
+    def load_free_list(self):
+        # Freed pages form a chain: the file header names the most recently freed page and
+        # each free page starts with the number of the page freed before it (-1 ends the chain)
+        if not self.file_header.has_free_list:
+            return
+        chain = []
+        page_num = self.file_header.next_free_page
+        while page_num != -1 and len(chain) < self.num_pages:
+            chain.append(page_num)
+            page_num = Integer.deserialize(self.get_page(page_num)[:4])
+        self.recycled_pages = chain[::-1]
+
+    def free_page(self, page_num):
+        """Release a page that is no longer referenced so get_free_page can hand it out again."""
+        page = bytearray(PAGE_SIZE)
+        page[:4] = Integer.serialize(self.recycled_pages[-1] if self.recycled_pages else -1)
+        self.pages[page_num] = page
+        self.flush_page(page_num)
+        self.recycled_pages.append(page_num)
+        self.set_free_page_header(page_num)
+
     def get_free_page(self):
-        # Always allocate a new page to prevent page reuse and data corruption
+        # Reuse the most recently freed page before growing the file
+        if self.recycled_pages:
+            page_num = self.recycled_pages.pop()
+            self.pages[page_num] = bytearray(PAGE_SIZE)
+            self.headers.pop(page_num, None)
+            self.set_free_page_header(self.recycled_pages[-1] if self.recycled_pages else None)
+            return page_num
         self.num_pages += 1
         return self.num_pages - 1
 
     def write_page(self, page_num, data):
-        self.pages[page_num] = bytearray(data)
+        # Writing back the cached page itself needs no copy
+        if data is not self.pages[page_num]:
+            self.pages[page_num] = bytearray(data)
         self.flush_page(page_num)
         return self.pages[page_num]
 
-    def flush_page(self, page_num):
+    def flush_page(self, page_num, start=0, end=PAGE_SIZE):
+        """Write the cached page to the file; start/end limit the write to the bytes that changed."""
+        self.headers.pop(page_num, None)
         if self.pages[page_num] is None:
-            print(f"Tried to flush page {page_num} but it is None")
+            logger.warning("Tried to flush page %d but it is None", page_num)
             return
-        self.file_ptr.seek(100 + page_num * PAGE_SIZE)  # 100 for file header
-        self.file_ptr.write(self.pages[page_num])
-        self.file_ptr.flush() # write to disk
+        data = self.pages[page_num] if start == 0 and end == PAGE_SIZE else memoryview(self.pages[page_num])[start:end]
+        self._write_at(data, 100 + page_num * PAGE_SIZE + start)  # 100 for file header
+
+    def _read_into(self, buffer, offset):
+        # preadv is missing on Windows and some macOS builds; fall back to seek + readinto there
+        if hasattr(os, "preadv"):
+            os.preadv(self.file_ptr.fileno(), [buffer], offset)
+        else:
+            self.file_ptr.seek(offset)
+            self.file_ptr.readinto(buffer)
+
+    def _write_at(self, data, offset):
+        # A single positioned write replaces seek + buffered write + flush where the OS has one
+        if hasattr(os, "pwrite"):
+            os.pwrite(self.file_ptr.fileno(), data, offset)
+        else:
+            self.file_ptr.seek(offset)
+            self.file_ptr.write(data)
+            self.file_ptr.flush()
 
     def close(self):
         self.file_ptr.close()
 
     def init_file_header(self):
         self.file_ptr.seek(0)
-        file_header = DatabaseFileHeader(version="kdb000", next_free_page=self.num_pages, has_free_list=False)
+        file_header = DatabaseFileHeader(version=FILE_FORMAT_VERSION, next_free_page=self.num_pages, has_free_list=False)
         file_header_bytes = file_header.to_header()
         self.file_ptr.write(file_header_bytes)
 
@@ -103,14 +169,19 @@ class Pager:
         self.file_ptr.seek(0)
         file_header_bytes = self.file_ptr.read(100)
         file_header = DatabaseFileHeader.from_header(file_header_bytes)
+        if file_header.version != FILE_FORMAT_VERSION:
+            self.file_ptr.close()
+            raise ValueError(f"Unsupported database file version {file_header.version!r}, expected {FILE_FORMAT_VERSION!r}")
         return file_header
 
-    def set_free_page_header(self, page_num: int):
-        self.file_ptr.seek(100)
-        file_header = DatabaseFileHeader(version="kdb000", next_free_page=page_num, has_free_list=False)
-        file_header = file_header.to_header()
-        self.file_ptr.write(file_header)
-        self.file_ptr.flush()
+    def set_free_page_header(self, page_num: int | None):
+        # page_num is the head of the free list, None once the list is empty
+        if page_num is None:
+            file_header = DatabaseFileHeader(version=FILE_FORMAT_VERSION, next_free_page=self.num_pages, has_free_list=False)
+        else:
+            file_header = DatabaseFileHeader(version=FILE_FORMAT_VERSION, next_free_page=page_num, has_free_list=True)
+        self._write_at(file_header.to_header(), 0)
+        self.file_header = file_header
 
     def read_page(self, page_num):
         return self.get_page(page_num)
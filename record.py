@@ -72,26 +72,15 @@ def deserialize_key(serialized_value: bytearray) -> int:
     key = Integer.deserialize(serialized_value[ptr:ptr + key_size])
     return key
 
+def deserialize_key_at(page: bytearray, offset: int) -> int:
+    """Read the key of the cell starting at offset without copying the rest of the page."""
+    key_size = Integer.deserialize(page[offset:offset + 4])
+    # Skip key_size and data_size (4 bytes each)
+    return Integer.deserialize(page[offset + 8:offset + 8 + key_size])
+
 def deserialize(serialized_value: bytearray, schema: BasicSchema) -> Record:
     # print("deserializing", schema)
-    values = {}
-    ptr = 0
-    key_size = Integer.deserialize(serialized_value[ptr:4])
-    ptr += 4
-    data_size = Integer.deserialize(serialized_value[ptr:ptr + 4])
-    ptr += 4
-    key = Integer.deserialize(serialized_value[ptr:ptr + key_size])
-    ptr += key_size
-    data_header = serialized_value[ptr:ptr + Integer.fixed_length * len(schema.columns)]
-    ptr += Integer.fixed_length * len(schema.columns)
-    data = serialized_value[ptr:ptr + data_size]
-    ptr = 0
-    for i, column in enumerate(schema.columns):
-        offset = data_header[i * Integer.fixed_length:i * Integer.fixed_length + Integer.fixed_length]
-        size = Integer.deserialize(offset)
-        key_name = column.name.name if hasattr(column.name, 'name') else str(column.name)
-        values[key_name] = column.datatype.deserialize(data[ptr:ptr + size])
-        ptr += size
+    values = schema.compile_unpacker()(serialized_value)
     # print("deserialized", values)
     return Record(values, schema)
 
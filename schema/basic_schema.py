@@ -1,3 +1,4 @@
+import struct
 from typing import List
 from schema.datatypes import Datatype, Integer, Text
 
@@ -55,6 +56,32 @@ class BasicSchema:
     def __init__(self, name: str, columns: List[Column]):
         self.name = name
         self.columns = columns
+        self._unpacker = None
+
+    def compile_unpacker(self):
+        """
+        Build (once) a function that decodes a serialized cell of this schema into a values dict.
+        The column names, datatype decoders and the struct for the per-column size header are
+        resolved up front, so decoding a cell only slices and decodes the column values.
+        """
+        if self._unpacker is not None:
+            return self._unpacker
+        names = [column.name.name if hasattr(column.name, 'name') else str(column.name) for column in self.columns]
+        decoders = [column.datatype.deserialize for column in self.columns]
+        sizes = struct.Struct(f"={len(self.columns)}i")
+
+        def unpack(cell) -> dict:
+            # key_size (4B) + data_size (4B) + key, then one size per column and the column data
+            header_offset = 8 + Integer.deserialize(cell[0:4])
+            ptr = header_offset + sizes.size
+            values = {}
+            for name, decode, size in zip(names, decoders, sizes.unpack_from(cell, header_offset)):
+                values[name] = decode(cell[ptr:ptr + size])
+                ptr += size
+            return values
+
+        self._unpacker = unpack
+        return unpack
 
     def get_primary_key(self):
         for column in self.columns:
@@ -1,6 +1,7 @@
 # Manage the state of the database
 
 from typing import List
+import logging
 import os
 from sqlite3 import Cursor
 from typing import Any
@@ -12,6 +13,8 @@ from btree import BTree
 from catalog.system_table import CatalogTable
 from symbols import WhereClause
 
+logger = logging.getLogger(__name__)
+
 class StateManager:
     """
     Manage the state of the database in memory.
@@ -99,8 +102,9 @@ class StateManager:
             raise ValueError(f"Table '{table_name}' not found")
         tree: BTree = self.trees[table_name]
         for record in records:            
-            print("deleting", record.get_primary_key())
-            tree.delete(record.get_primary_key())
+            key = record.get_primary_key()
+            logger.debug("deleting %s", key)
+            tree.delete(key)
     
     def update(self, table_name: str, column: str, value: Any, records: List[Record]):
         """Update records in the specified table (single column)"""
@@ -113,7 +117,8 @@ class StateManager:
         schema = self.schemas[table_name]
         
         for record in records:
-            print("updating", record.get_primary_key())
+            key = record.get_primary_key()
+            logger.debug("updating %s", key)
             
             # Extract column name from ColumnName object
             column_name = column.name if hasattr(column, 'name') else str(column)
@@ -141,7 +146,8 @@ class StateManager:
         schema = self.schemas[table_name]
         
         for record in records:
-            print("updating", record.get_primary_key())
+            key = record.get_primary_key()
+            logger.debug("updating %s", key)
             
             # Update multiple columns in the record
             for update_item in update_list.items:
@@ -4,8 +4,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from btree import BTree, InternalNodeHeader, LeafNodeHeader, NodeType, get_node_type
-from pager import Pager, DatabaseFileHeader
+from btree import BTree, InternalNodeHeader, LeafNodeHeader, NodeType, get_node_type, HEADER_PREFIX_SIZE, CELL_POINTER_SIZE, LEAF_NODE_MAX_CELLS
+from pager import Pager, DatabaseFileHeader, FILE_FORMAT_VERSION
 from record import Record, serialize, deserialize, cell_size
 from schema.basic_schema import BasicSchema, Column
 from schema.datatypes import Integer, Text
@@ -145,6 +145,98 @@ def test_internal_node_header():
     print("✓ Internal node header tests passed!")
 
 
+def test_wide_node_header():
+    """Test header round trip for nodes packed with hundreds of keys and cell pointers"""
+    print("Testing wide node header serialization/deserialization...")
+
+    keys = list(range(0, 2000, 5))
+    children = list(range(1, len(keys) + 1))
+    internal_header = InternalNodeHeader(
+        is_root=False,
+        parent_page_num=7,
+        num_keys=len(keys),
+        right_child_page_num=len(keys) + 1,
+        keys=keys,
+        children=children
+    )
+    serialized = internal_header.to_header()
+    assert len(serialized) == HEADER_PREFIX_SIZE + 8 * len(keys), "Header size mismatch"
+    deserialized = InternalNodeHeader.from_header(serialized)
+    assert list(deserialized.keys) == keys, "Keys mismatch"
+    assert list(deserialized.children) == children, "Children mismatch"
+    assert deserialized.right_child_page_num == len(keys) + 1, "Right child page num mismatch"
+
+    # Writing into a page must produce the same bytes as to_header
+    page = bytearray(4096 * 2)
+    internal_header.write_into(page)
+    assert page[:len(serialized)] == serialized, "write_into mismatch"
+
+    cell_pointers = list(range(4000, 1000, -7))
+    leaf_header = LeafNodeHeader(
+        is_root=False,
+        parent_page_num=3,
+        num_cells=len(cell_pointers),
+        allocation_pointer=cell_pointers[-1],
+        cell_pointers=cell_pointers
+    )
+    # Parse out of a full page buffer, as the B-tree does
+    page = bytearray(4096 * 2)
+    serialized = leaf_header.to_header()
+    page[:len(serialized)] = serialized
+    deserialized = LeafNodeHeader.from_header(page)
+    assert deserialized.num_cells == len(cell_pointers), "Num cells mismatch"
+    assert list(deserialized.cell_pointers) == cell_pointers, "Cell pointers mismatch"
+
+    page = bytearray(4096 * 2)
+    leaf_header.write_into(memoryview(page))
+    assert page[:len(serialized)] == serialized, "write_into mismatch"
+
+    print("✓ Wide node header tests passed!")
+
+
+def test_full_leaf_round_trip():
+    """Test that a leaf holding LEAF_NODE_MAX_CELLS cells survives closing and reopening the file"""
+    print("Testing full leaf round trip...")
+
+    test_db_file = "test_full_leaf.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+    root_page_num = tree.root_page_num
+
+    # The smallest records there are, so the leaf fills up on cell count before bytes
+    schema = BasicSchema("test_table", [Column("id", Integer(), True)])
+    cells = [serialize(Record(values={"id": i}, schema=schema)) for i in range(1, LEAF_NODE_MAX_CELLS + 1)]
+    for cell in reversed(cells):
+        tree.insert(cell)
+    pager.close()
+
+    pager = Pager(test_db_file)
+    tree = BTree(pager, root_page_num)
+    page = pager.get_page(root_page_num)
+    assert get_node_type(page) == NodeType.LEAF, "Root should still be a single leaf"
+    header = LeafNodeHeader.from_header(page)
+    assert header.num_cells == LEAF_NODE_MAX_CELLS, "Num cells mismatch"
+    assert LeafNodeHeader.header_size(header.num_cells) == HEADER_PREFIX_SIZE + CELL_POINTER_SIZE * LEAF_NODE_MAX_CELLS, "Header size mismatch"
+    assert header.allocation_pointer == pager.page_size - sum(len(cell) for cell in cells), "Allocation pointer mismatch"
+    assert header.allocation_pointer >= LeafNodeHeader.header_size(header.num_cells), "Cells overlap the header"
+
+    # Each pointer is CELL_POINTER_SIZE bytes, in key order, right after the header prefix
+    for i, cell in enumerate(cells):
+        offset = HEADER_PREFIX_SIZE + CELL_POINTER_SIZE * i
+        ptr = int.from_bytes(page[offset:offset + CELL_POINTER_SIZE], sys.byteorder)
+        assert ptr == header.cell_pointers[i], f"Cell pointer {i} mismatch"
+        assert page[ptr:ptr + len(cell)] == cell, f"Cell {i} mismatch"
+        assert tree.find(i + 1) == root_page_num, f"Key {i + 1} should be in the root leaf"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Full leaf round trip tests passed!")
+
+
 def test_pager():
     """Test creating a new database file and basic pager operations"""
     print("Testing pager functionality...")
@@ -157,7 +249,7 @@ def test_pager():
     # Create new pager and verify file header
     pager = Pager(test_db_file)
     tree = BTree.new_tree(pager)
-    assert pager.file_header.version == "kdb000"
+    assert pager.file_header.version == FILE_FORMAT_VERSION
     assert pager.file_header.next_free_page == 0
     assert pager.file_header.has_free_list == False
 
@@ -204,13 +296,80 @@ def test_pager():
     assert len(empty_page) == pager.page_size
     assert all(b == 0 for b in empty_page)
 
-    # Clean up
     pager.close()
+
+    # A file written with another page layout must be refused rather than misread
+    with open(test_db_file, "rb+") as f:
+        f.write(DatabaseFileHeader(version="kdb000", next_free_page=0, has_free_list=False).to_header())
+    try:
+        Pager(test_db_file)
+        assert False, "Expected a file with an old version to be refused"
+    except ValueError:
+        pass
+
+    # Clean up
     os.remove(test_db_file)
 
     print("✓ Pager tests passed!")
 
 
+def test_free_list():
+    """Test that freed pages are reused, survive reopening the file, and are released by merges"""
+    print("Testing free list...")
+
+    test_db_file = "test_free_list.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+    for _ in range(3):
+        page_num = pager.get_free_page()
+        pager.write_page(page_num, bytearray(b"\x01" * pager.page_size))
+
+    pager.free_page(1)
+    pager.free_page(3)
+    assert pager.recycled_pages == [1, 3]
+    assert pager.file_header.has_free_list == True
+    assert pager.file_header.next_free_page == 3
+    pager.close()
+
+    # The chain of free pages is read back from the file
+    pager = Pager(test_db_file)
+    assert pager.recycled_pages == [1, 3], f"Expected [1, 3], got {pager.recycled_pages}"
+    # The most recently freed page is handed out first, and comes back zeroed
+    assert pager.get_free_page() == 3
+    assert not any(pager.get_page(3))
+    assert pager.get_free_page() == 1
+    assert pager.file_header.has_free_list == False
+    # Once the list is empty the file grows again
+    assert pager.get_free_page() == 4
+    pager.close()
+    os.remove(test_db_file)
+
+    # Merging two leaves releases the page of the right one
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+    # Records large enough that only three fit in a leaf, so the fourth splits it
+    for i in range(1, 5):
+        tree.insert(serialize(Record(values={"id": i, "data": f"record {i}" + "x" * 1000}, schema=schema)))
+    right_page_num = tree.find(4)
+    assert right_page_num != tree.find(1), "Expected the records to span two leaves"
+    tree.delete(4)
+    tree.delete(3)
+    assert right_page_num in pager.recycled_pages, f"Expected page {right_page_num} to be freed, got {pager.recycled_pages}"
+    assert tree.find(2) == tree.find(1)
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Free list tests passed!")
+
+
 def test_insert():
     """Test the insert function"""
     print("Testing insert functionality...")
@@ -262,6 +421,86 @@ def test_insert():
     print("✓ Insert tests passed!")
 
 
+def test_insert_many():
+    """Test inserting a batch of cells"""
+    print("Testing insert_many functionality...")
+
+    test_db_file = "test_insert_many.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Enough records to fill the root leaf and force splits in the middle of the batch
+    # (records large enough that only three fit in a leaf)
+    records = [Record(values={"id": i, "data": f"record {i}" + "x" * 1000}, schema=schema) for i in range(1, 11)]
+    results = tree.insert_many([serialize(r) for r in records])
+    assert len(results) == len(records), "Expected one (position, length) per cell"
+    assert get_node_type(pager.get_page(tree.root_page_num)) == NodeType.INTERNAL, "Root leaf should have split"
+    assert len({tree.find(r.values["id"]) for r in records}) > 1, "Records should span more than one leaf"
+
+    # Every record must be on disk in the leaf that find() returns for its key
+    for record in records:
+        key = record.values["id"]
+        page = pager.read_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        found = [deserialize(page[ptr:], schema) for ptr in header.cell_pointers]
+        matches = [r for r in found if r.values["id"] == key]
+        assert len(matches) == 1, f"Record {key} not found exactly once"
+        assert matches[0].values["data"] == record.values["data"], f"Record {key} data mismatch"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ insert_many tests passed!")
+
+
+def test_find_cell():
+    """Test that leaf cells stay sorted by key and can be binary searched"""
+    print("Testing find_cell functionality...")
+
+    test_db_file = "test_find_cell.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Insert out of order; the cell pointers must come out sorted by key
+    for key in [30, 10, 20]:
+        tree.insert(serialize(Record(values={"id": key, "data": f"record {key}"}, schema=schema)))
+
+    page = pager.get_page(tree.root_page_num)
+    header = LeafNodeHeader.from_header(page)
+    keys = [deserialize(page[ptr:], schema).values["id"] for ptr in header.cell_pointers]
+    assert keys == [10, 20, 30], f"Cell pointers not sorted by key: {keys}"
+    assert header.max_key(page) == 30, "Max key should be the last cell's key"
+
+    # find_cell returns the index of the first cell whose key is >= the search key
+    assert tree.find_cell(page, 10) == 0, "Expected index 0 for key 10"
+    assert tree.find_cell(page, 20) == 1, "Expected index 1 for key 20"
+    assert tree.find_cell(page, 30) == 2, "Expected index 2 for key 30"
+    assert tree.find_cell(page, 5) == 0, "Expected index 0 for a key below the range"
+    assert tree.find_cell(page, 15) == 1, "Expected index 1 for a key between cells"
+    assert tree.find_cell(page, 31) == 3, "Expected num_cells for a key above the range"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ find_cell tests passed!")
+
+
 def test_split_leaf_node():
     """Test the split_leaf_node functionality"""
     print("Testing leaf node split functionality...")
@@ -283,7 +522,8 @@ def test_split_leaf_node():
     # Create test records - enough to fill a leaf node and trigger a split
     records = []
     for i in range(4):  # Insert one more than max to trigger split
-        records.append(Record(values={"id": i + 1, "data": f"record {i + 1}"}, schema=schema))
+        # Records large enough that only three fit in a leaf
+        records.append(Record(values={"id": i + 1, "data": f"record {i + 1}" + "x" * 1000}, schema=schema))
 
     # Insert records as cells - the last one should trigger a split
     for i, record in enumerate(records):
@@ -338,6 +578,82 @@ def test_split_leaf_node():
     print("✓ Split leaf node tests passed!")
 
 
+def test_split_leaf_node_skewed_cells():
+    """Test that leaves split by bytes, so a large cell still finds room after uneven splits"""
+    print("Testing leaf node split with skewed cell sizes...")
+
+    test_db_file = "test_split_skewed.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # One cell takes most of the page; splitting by count would leave it sharing a leaf
+    # with the incoming 1000-byte cell
+    sizes = {10: 3000, 20: 200, 30: 200, 40: 200, 50: 200, 5: 1000}
+    for key, size in sizes.items():
+        tree.insert(serialize(Record(values={"id": key, "data": "x" * size}, schema=schema)))
+
+    for key, size in sizes.items():
+        page = pager.get_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        found = [deserialize(page[ptr:], schema) for ptr in header.cell_pointers]
+        matches = [r for r in found if r.values["id"] == key]
+        assert len(matches) == 1, f"Record {key} not found exactly once"
+        assert len(matches[0].values["data"]) == size, f"Record {key} data mismatch"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Skewed split tests passed!")
+
+
+def test_redistribute_leaf_nodes_skewed_cells():
+    """Test that a delete redistributes leaves by bytes, so one very large cell does not overfill a leaf"""
+    print("Testing leaf redistribution with skewed cell sizes...")
+
+    test_db_file = "test_redistribute_skewed.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Key 1 nearly fills a leaf by itself; keys 2-5 end up in its right sibling
+    sizes = {1: 3870, 2: 180, 3: 180, 4: 180, 5: 180}
+    for key, size in sizes.items():
+        tree.insert(serialize(Record(values={"id": key, "data": "x" * size}, schema=schema)))
+
+    # The right leaf underflows, but the two leaves can't be merged; splitting them by
+    # count would put keys 1 and 2 into one page
+    assert tree.delete(5) == True, "Delete should return True for existing key"
+    del sizes[5]
+
+    for key, size in sizes.items():
+        page = pager.get_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        found = [deserialize(page[ptr:], schema) for ptr in header.cell_pointers]
+        matches = [r for r in found if r.values["id"] == key]
+        assert len(matches) == 1, f"Record {key} not found exactly once"
+        assert len(matches[0].values["data"]) == size, f"Record {key} data mismatch"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Skewed redistribution tests passed!")
+
+
 def test_delete_function():
     """Test the delete function implementation"""
     print("\nTesting delete function...")
@@ -405,12 +721,166 @@ def test_delete_function():
     print("✓ Delete function tests passed!")
 
 
+def test_delete_redistributes_leaves():
+    """Test that a delete leaving a leaf under-filled borrows cells from a nearly full sibling"""
+    print("Testing leaf redistribution after delete...")
+
+    test_db_file = "test_delete_redistribute.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Thirteen records split the root leaf; five more then nearly fill the left leaf
+    keys = list(range(10, 140, 10)) + list(range(11, 16))
+    for key in keys:
+        tree.insert(serialize(Record(values={"id": key, "data": "x" * 300}, schema=schema)))
+    root_page_num = tree.root_page_num
+    root_header = InternalNodeHeader.from_header(pager.get_page(root_page_num))
+    assert root_header.num_keys == 1, "Root should have two leaves"
+    left_page_num, right_page_num = root_header.children[0], root_header.right_child_page_num
+    assert LeafNodeHeader.from_header(pager.get_page(left_page_num)).num_cells == 12, "Left leaf should be nearly full"
+    assert LeafNodeHeader.from_header(pager.get_page(right_page_num)).num_cells == 6, "Right leaf should hold six cells"
+
+    # The right leaf drops under a quarter full; the two leaves don't fit in one page, so they are rebalanced
+    for key in (80, 90, 100):
+        assert tree.delete(key) == True, f"Delete of {key} should succeed"
+        keys.remove(key)
+    left_header = LeafNodeHeader.from_header(pager.get_page(left_page_num))
+    right_header = LeafNodeHeader.from_header(pager.get_page(right_page_num))
+    assert (left_header.num_cells, right_header.num_cells) == (8, 7), "Cells should be split evenly by bytes"
+
+    # The separator is the new max key of the left leaf, and every record is found through it
+    root_header = InternalNodeHeader.from_header(pager.get_page(root_page_num))
+    assert root_header.keys[0] == left_header.max_key(pager.get_page(left_page_num)), "Separator key mismatch"
+    for key in keys:
+        page = pager.get_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        found = [deserialize(page[ptr:], schema).values["id"] for ptr in header.cell_pointers]
+        assert found.count(key) == 1, f"Record {key} not found exactly once"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Leaf redistribution tests passed!")
+
+
+def test_delete_collapses_root():
+    """Test that a root left with a single child is replaced by it on the same page"""
+    print("Testing root collapse after delete...")
+
+    test_db_file = "test_collapse_root.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Records large enough that only three fit in a leaf, so the fourth splits the root
+    for key in range(1, 5):
+        tree.insert(serialize(Record(values={"id": key, "data": "x" * 1000}, schema=schema)))
+    root_page_num = tree.root_page_num
+    root_header = InternalNodeHeader.from_header(pager.get_page(root_page_num))
+    assert root_header.num_keys == 1, "Root should have two leaves"
+    right_leaf_page_num = root_header.right_child_page_num
+
+    # Emptying the right leaf merges it into the left one, leaving the root a single child
+    tree.delete(3)
+    tree.delete(4)
+    assert tree.root_page_num == root_page_num, "Root page number should not change"
+    root_page = pager.get_page(root_page_num)
+    assert get_node_type(root_page) == NodeType.LEAF, "Root should have collapsed into a leaf"
+    root_leaf_header = LeafNodeHeader.from_header(root_page)
+    assert root_leaf_header.is_root and root_leaf_header.parent_page_num == 0, "Root flags mismatch"
+    assert root_leaf_header.num_cells == 2, "Root leaf should hold the remaining records"
+    assert right_leaf_page_num in pager.recycled_pages, "The merged leaf should be freed"
+    assert len(pager.recycled_pages) == 2, "The promoted child's page should be freed too"
+    pager.close()
+
+    # The tree opens from the same root page it was created with
+    pager = Pager(test_db_file)
+    tree = BTree(pager, root_page_num)
+    for key in (1, 2):
+        page = pager.get_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        keys = [deserialize(page[ptr:], schema).values["id"] for ptr in header.cell_pointers]
+        assert key in keys, f"Record {key} not found after reopening"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ Root collapse tests passed!")
+
+
+def test_update_cell_grows_full_leaf():
+    """Test that growing a record in a full leaf splits the leaf instead of losing the record"""
+    print("Testing update_cell on a full leaf...")
+
+    test_db_file = "test_update_cell.db"
+    if os.path.exists(test_db_file):
+        os.remove(test_db_file)
+
+    pager = Pager(test_db_file)
+    tree = BTree.new_tree(pager)
+
+    schema = BasicSchema("test_table", [
+        Column("id", Integer(), True),
+        Column("data", Text(), False)
+    ])
+
+    # Fill the root leaf almost to the last byte
+    for i in range(1, 33):
+        tree.insert(serialize(Record(values={"id": i, "data": "x" * 100}, schema=schema)))
+    assert get_node_type(pager.get_page(tree.root_page_num)) == NodeType.LEAF, "Root should still be a single leaf"
+
+    # The grown record no longer fits next to the others, so the leaf has to split
+    tree.update_cell(2, serialize(Record(values={"id": 2, "data": "y" * 300}, schema=schema)))
+    assert get_node_type(pager.get_page(tree.root_page_num)) == NodeType.INTERNAL, "Root leaf should have split"
+
+    # The record must survive, and can be updated again
+    tree.update_cell(2, serialize(Record(values={"id": 2, "data": "z" * 300}, schema=schema)))
+    for key in range(1, 33):
+        page = pager.get_page(tree.find(key))
+        header = LeafNodeHeader.from_header(page)
+        found = [deserialize(page[ptr:], schema) for ptr in header.cell_pointers]
+        matches = [r for r in found if r.values["id"] == key]
+        assert len(matches) == 1, f"Record {key} not found exactly once"
+        expected = "z" * 300 if key == 2 else "x" * 100
+        assert matches[0].values["data"] == expected, f"Record {key} data mismatch"
+
+    pager.close()
+    os.remove(test_db_file)
+
+    print("✓ update_cell tests passed!")
+
+
 if __name__ == "__main__":
     test_page_header()
     test_file_header()
     test_internal_node_header()
+    test_wide_node_header()
+    test_full_leaf_round_trip()
     test_pager()
+    test_free_list()
     test_insert()
+    test_insert_many()
+    test_find_cell()
     test_split_leaf_node()
+    test_split_leaf_node_skewed_cells()
+    test_redistribute_leaf_nodes_skewed_cells()
     test_delete_function()
+    test_delete_redistributes_leaves()
+    test_delete_collapses_root()
+    test_update_cell_grows_full_leaf()
     print("\n✓ All tests passed!")
\ No newline at end of file
@@ -197,8 +197,9 @@ def test_cursor_navigation():
     ])
 
     # Insert records to create multiple leaf nodes
+    # Records large enough that only three fit in a leaf, so the fourth splits it
     for i in range(1, 5):
-        record = Record(values={"id": i, "data": f"data_{i}"}, schema=schema)
+        record = Record(values={"id": i, "data": f"data_{i}" + "x" * 1000}, schema=schema)
         cell = serialize(record)
         tree.insert(cell)
 
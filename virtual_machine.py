@@ -1,3 +1,4 @@
+import logging
 from abc import ABC, abstractmethod
 from btree import LeafNodeHeader
 from cursor import Cursor
@@ -10,6 +11,8 @@ from state_manager import StateManager
 from visitor import Visitor
 from symbols import *
 
+logger = logging.getLogger(__name__)
+
 class VirtualMachine(Visitor):
     def __init__(self, file_path: str):
         self.stack = []
@@ -87,7 +90,7 @@ class VirtualMachine(Visitor):
         pass
 
     def visit_selectable(self, stmt: Selectable):
-        print("selectable", stmt)
+        logger.debug("selectable %s", stmt)
 
     def visit_program(self, stmt: Program):
         for stmt in stmt.statements: